@@ -0,0 +1,164 @@
+"""Offline throughput benchmark for the exporter and both enrichers.
+
+Starts the local stand-in (standin_server.py), points the scripts at it and
+times, for each dataset size:
+
+    export   src/main.py                               Liked Songs -> CSV
+    genres   src/preprocessing/enriched_with_genres.py CSV -> CSV + genre
+    gender   src/preprocessing/enriched_with_gender.py CSV -> CSV + gender
+
+and reports wall time, requests/sec and rows/sec. A stage that writes a
+different number of rows than the catalogue size is reported as an error
+(exit code 1).
+
+Usage:
+    python run_benchmark.py --sizes 1000 5000 20000 --latency 0.01 --error-rate 0.005
+    python run_benchmark.py --sizes 2000 --stages export genres --json results.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import importlib
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.dirname(BENCH_DIR)
+PREPROCESSING_DIR = os.path.join(SRC_DIR, "preprocessing")
+
+STAGES = ("export", "genres", "gender")
+BENCH_TOKEN = {"access_token": "bench-token"}
+
+
+def _count_rows(path: str) -> int:
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return sum(1 for _ in csv.DictReader(f))
+
+
+def load_modules(base_url: str, spotify_rate: Optional[float]) -> Dict[str, Any]:
+    """Import the three scripts with their API bases redirected to the stand-in."""
+    os.environ["SPOTIFY_API_BASE"] = f"{base_url}/v1"
+    os.environ["MUSICBRAINZ_API_BASE"] = f"{base_url}/ws/2"
+    os.environ["MUSICBRAINZ_DELAY"] = "0"
+    if spotify_rate is not None:
+        os.environ["SPOTIFY_RATE"] = str(spotify_rate)
+    for path in (SRC_DIR, PREPROCESSING_DIR, BENCH_DIR):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    return {
+        "export": importlib.import_module("main"),
+        "genres": importlib.import_module("enriched_with_genres"),
+        "gender": importlib.import_module("enriched_with_gender"),
+        "http": importlib.import_module("spotify_http"),
+    }
+
+
+def reset_caches(mods: Dict[str, Any]) -> None:
+    """Every run starts cold: in-memory caches cleared, no on-disk album cache."""
+    mods["export"].close_album_cache()
+    mods["export"]._album_total_cache.clear()
+    mods["genres"]._artist_genres_cache.clear()
+    mods["genres"]._album_artists_cache.clear()
+    mods["http"].reset_stats()
+
+
+def run_stage(stage: str, mods: Dict[str, Any], workdir: str) -> str:
+    liked_csv = os.path.join(workdir, "liked.csv")
+    if stage == "export":
+        mods["export"].export_liked_tracks_csv(BENCH_TOKEN, liked_csv, resume=False)
+        return liked_csv
+    if stage == "genres":
+        out = os.path.join(workdir, "liked-with_genres.csv")
+        mods["genres"].enrich_csv_with_genres(liked_csv, out, BENCH_TOKEN)
+        return out
+    if stage == "gender":
+        out = os.path.join(workdir, "liked-with_gender.csv")
+        mods["gender"].enrich_dataset(liked_csv, out, cache_path=None)
+        return out
+    raise ValueError(stage)
+
+
+def run(sizes: List[int], stages: List[str], latency: float, page_size: int,
+        error_rate: float, spotify_rate: Optional[float], gender_max: int) -> List[Dict[str, Any]]:
+    import standin_server
+
+    srv = standin_server.start_server(standin_server.Catalog(1), latency=latency, page_size=page_size,
+                                      error_rate=error_rate, retry_after=1)
+    mods = load_modules(f"http://127.0.0.1:{srv.server_port}", spotify_rate)
+    results: List[Dict[str, Any]] = []
+
+    for size in sizes:
+        srv.reset(standin_server.Catalog(size))
+        with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+            # The export always runs first: the enrichers read its CSV
+            for stage in ["export"] + [s for s in stages if s != "export"]:
+                if stage == "gender" and size > gender_max:
+                    continue
+                reset_caches(mods)
+                before = srv.stats()
+                t0 = time.perf_counter()
+                out = run_stage(stage, mods, workdir)
+                wall = time.perf_counter() - t0
+                after = srv.stats()
+                if stage not in stages:
+                    continue
+                n_req = after.get("requests", 0) - before.get("requests", 0)
+                rows = _count_rows(out)
+                results.append({
+                    "stage": stage,
+                    "size": size,
+                    "rows": rows,
+                    "complete": rows == size,
+                    "requests": n_req,
+                    "throttled": after.get("429", 0) - before.get("429", 0),
+                    "wall_s": round(wall, 3),
+                    "req_per_s": round(n_req / wall, 1) if wall else None,
+                    "rows_per_s": round(rows / wall, 1) if wall else None,
+                })
+    srv.shutdown()
+    return results
+
+
+def print_table(results: List[Dict[str, Any]]) -> None:
+    cols = ["stage", "size", "rows", "requests", "throttled", "wall_s", "req_per_s", "rows_per_s"]
+    widths = {c: max(len(c), *(len(str(r[c])) for r in results)) for c in cols} if results else {c: len(c) for c in cols}
+    print("  ".join(c.rjust(widths[c]) for c in cols))
+    for r in results:
+        print("  ".join(str(r[c]).rjust(widths[c]) for c in cols))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Offline benchmark of the exporter and enrichers.")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000], help="number of tracks per run")
+    ap.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    ap.add_argument("--latency", type=float, default=0.005, help="stand-in latency per request (s)")
+    ap.add_argument("--page-size", type=int, default=50)
+    ap.add_argument("--error-rate", type=float, default=0.0, help="probability of an injected 429")
+    ap.add_argument("--spotify-rate", type=float, default=None,
+                    help="starting SPOTIFY_RATE for the shared limiter (default: the limiter's own, which adapts upwards)")
+    ap.add_argument("--gender-max", type=int, default=5000,
+                    help="skip the gender stage above this size")
+    ap.add_argument("--json", dest="json_path", help="also write results to this JSON file")
+    args = ap.parse_args()
+
+    results = run(args.sizes, args.stages, args.latency, args.page_size, args.error_rate,
+                  args.spotify_rate, args.gender_max)
+    print_table(results)
+    incomplete = [r for r in results if not r["complete"]]
+    for r in incomplete:
+        print(f"ERROR: {r['stage']} wrote {r['rows']} rows for a catalogue of {r['size']} tracks", file=sys.stderr)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if incomplete:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""Local stand-in for the Spotify Web API and the MusicBrainz artist search.
+
+Serves a deterministic synthetic catalogue so that the exporter (src/main.py)
+and both enrichers can be run and timed without touching the real services:
+
+    GET /v1/me/tracks                 GET /v1/playlists/{id}[/tracks]
+    GET /v1/albums?ids= | /{id}       GET /v1/artists?ids= | /{id}
+    GET /ws/2/artist/?query=artist:"..." [OR artist:"..."]&limit=&fmt=json
+    GET /__stats                      (request counters, JSON)
+
+Latency, maximum page size and 429 injection are configurable.
+
+Usage:
+    python standin_server.py --tracks 10000 --port 8900 --latency 0.02 --error-rate 0.01
+then point the scripts at it:
+    SPOTIFY_API_BASE=http://127.0.0.1:8900/v1 MUSICBRAINZ_API_BASE=http://127.0.0.1:8900/ws/2
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import http.server
+import json
+import random
+import re
+import string
+import threading
+import time
+import urllib.parse
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+_ALPHABET = string.ascii_letters + string.digits
+_GENRES = ["pop", "dance pop", "rock", "classic rock", "hip hop", "rap", "edm", "synthpop",
+           "jazz", "motown", "metal", "country", "folk", "r&b", "soul", "k-pop"]
+_GENDERS = ["male", "female", "non-binary", None]
+_COUNTRIES = ["US", "GB", "FR", "KR", "SE", "CA"]
+
+
+def spotify_id(kind: str, n: int) -> str:
+    """Deterministic 22-char base62 ID, like real Spotify IDs."""
+    digest = hashlib.sha256(f"{kind}:{n}".encode()).digest()
+    return "".join(_ALPHABET[b % len(_ALPHABET)] for b in digest[:22])
+
+
+class Catalog:
+    """Synthetic library: every track has 1-3 artists and belongs to one album."""
+
+    def __init__(self, tracks: int = 1000, artists: Optional[int] = None, albums: Optional[int] = None) -> None:
+        self.n_tracks = tracks
+        self.n_artists = artists or max(1, tracks // 4)
+        self.n_albums = albums or max(1, tracks // 8)
+        self.album_ids = [spotify_id("album", i) for i in range(self.n_albums)]
+        self.artist_ids = [spotify_id("artist", i) for i in range(self.n_artists)]
+        self.album_index = {aid: i for i, aid in enumerate(self.album_ids)}
+        self.artist_index = {aid: i for i, aid in enumerate(self.artist_ids)}
+        self.artist_by_name = {self.artist_name(i).lower(): i for i in range(self.n_artists)}
+
+    # ---- objects ----
+    def artist_name(self, i: int) -> str:
+        return f"Artist {i}"
+
+    def artist(self, i: int) -> Dict[str, Any]:
+        return {
+            "id": self.artist_ids[i],
+            "name": self.artist_name(i),
+            "type": "artist",
+            "genres": [_GENRES[(i + k) % len(_GENRES)] for k in range(i % 3)],
+        }
+
+    def album(self, i: int, full: bool = True) -> Dict[str, Any]:
+        year = 1960 + i % 65
+        precision = ("day", "day", "month", "year")[i % 4]
+        date = {"day": f"{year}-{i % 12 + 1:02d}-{i % 28 + 1:02d}", "month": f"{year}-{i % 12 + 1:02d}", "year": str(year)}[precision]
+        out = {
+            "id": self.album_ids[i],
+            "name": f"Album {i}",
+            "release_date": date,
+            "release_date_precision": precision,
+            "total_tracks": 8 + i % 12,
+            "artists": [self.artist(i % self.n_artists)] if full else [{"id": self.artist_ids[i % self.n_artists]}],
+        }
+        return out
+
+    def track_item(self, i: int) -> Dict[str, Any]:
+        n_art = 1 + i % 3
+        artists = [{"id": self.artist_ids[(i + k * 7) % self.n_artists], "name": self.artist_name((i + k * 7) % self.n_artists)}
+                   for k in range(n_art)]
+        added = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(1_600_000_000 + i * 60))
+        return {
+            "added_at": added,
+            "track": {
+                "type": "track",
+                "id": spotify_id("track", i),
+                "name": f"Song {i}" + (" - 2016 Remaster" if i % 50 == 0 else ""),
+                "popularity": i % 101,
+                "duration_ms": 120_000 + (i * 7919) % 240_000,
+                "artists": artists,
+                "album": self.album(i % self.n_albums, full=False),
+            },
+        }
+
+    def mb_artist(self, i: int, score: int = 100) -> Dict[str, Any]:
+        gender = _GENDERS[i % len(_GENDERS)]
+        group = i % 5 == 0
+        return {
+            "id": hashlib.md5(f"mb:{i}".encode()).hexdigest(),
+            "name": self.artist_name(i),
+            "score": score,
+            "type": "Group" if group else "Person",
+            "gender": None if group else gender,
+            "country": _COUNTRIES[i % len(_COUNTRIES)],
+            "area": {"name": _COUNTRIES[i % len(_COUNTRIES)]},
+            "life-span": {"begin": str(1940 + i % 70), "ended": None},
+        }
+
+
+class StandInServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr, catalog: Catalog, latency: float = 0.0, page_size: int = 50,
+                 error_rate: float = 0.0, retry_after: int = 1, seed: int = 0) -> None:
+        super().__init__(addr, StandInHandler)
+        self.catalog = catalog
+        self.latency = latency
+        self.page_size = page_size
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.counts: Counter = Counter()
+        self.lock = threading.Lock()
+
+    def count(self, key: str) -> None:
+        with self.lock:
+            self.counts[key] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return dict(self.counts)
+
+    def reset(self, catalog: Optional[Catalog] = None) -> None:
+        with self.lock:
+            self.counts.clear()
+            if catalog is not None:
+                self.catalog = catalog
+
+
+_MB_CLAUSE = re.compile(r'artist:"((?:[^"\\]|\\.)*)"')
+
+
+class StandInHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real APIs
+    server: StandInServer
+
+    def log_message(self, *_):
+        return
+
+    def _send(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        q = dict(urllib.parse.parse_qsl(url.query))
+        parts = [p for p in url.path.split("/") if p]
+        srv = self.server
+
+        if parts == ["__stats"]:
+            return self._send(200, srv.stats())
+
+        srv.count("requests")
+        if srv.latency:
+            time.sleep(srv.latency)
+        if srv.error_rate and srv.rng.random() < srv.error_rate:
+            srv.count("429")
+            return self._send(429, {"error": {"status": 429, "message": "API rate limit exceeded"}},
+                              {"Retry-After": str(srv.retry_after)})
+
+        try:
+            if parts[:2] == ["ws", "2"]:
+                return self._musicbrainz(parts[2:], q)
+            if parts[:1] == ["v1"]:
+                return self._spotify(parts[1:], q)
+        except (KeyError, ValueError, IndexError):
+            return self._send(400, {"error": {"status": 400, "message": "bad request"}})
+        return self._send(404, {"error": {"status": 404, "message": "not found"}})
+
+    # ---- Spotify ----
+    def _page(self, q: Dict[str, str], n: int, path: str) -> Dict[str, Any]:
+        cat = self.server.catalog
+        offset = int(q.get("offset", 0))
+        limit = min(int(q.get("limit", 20)), self.server.page_size)
+        # newest first, like /me/tracks
+        idx = range(n - 1 - offset, max(n - 1 - offset - limit, -1), -1)
+        items = [cat.track_item(i) for i in idx]
+        nxt = f"{path}?offset={offset + limit}&limit={limit}" if offset + limit < n else None
+        return {"items": items, "total": n, "limit": limit, "offset": offset, "next": nxt}
+
+    def _spotify(self, parts: List[str], q: Dict[str, str]) -> None:
+        srv, cat = self.server, self.server.catalog
+        if parts == ["me", "tracks"]:
+            srv.count("me/tracks")
+            return self._send(200, self._page(q, cat.n_tracks, "/v1/me/tracks"))
+        if parts[0] == "playlists" and len(parts) == 2:
+            srv.count("playlists")
+            return self._send(200, {"id": parts[1], "name": f"Playlist {parts[1]}", "snapshot_id": "bench"})
+        if parts[0] == "playlists" and parts[2:] == ["tracks"]:
+            srv.count("playlists/tracks")
+            return self._send(200, self._page(q, cat.n_tracks, f"/v1/playlists/{parts[1]}/tracks"))
+        if parts == ["albums"]:
+            srv.count("albums")
+            ids = q["ids"].split(",")[:20]
+            return self._send(200, {"albums": [cat.album(cat.album_index[a]) if a in cat.album_index else None for a in ids]})
+        if parts[0] == "albums" and len(parts) == 2:
+            srv.count("albums/{id}")
+            if parts[1] not in cat.album_index:
+                return self._send(404, {"error": {"status": 404, "message": "non existing id"}})
+            return self._send(200, cat.album(cat.album_index[parts[1]]))
+        if parts == ["artists"]:
+            srv.count("artists")
+            ids = q["ids"].split(",")[:50]
+            return self._send(200, {"artists": [cat.artist(cat.artist_index[a]) if a in cat.artist_index else None for a in ids]})
+        if parts[0] == "artists" and len(parts) == 2:
+            srv.count("artists/{id}")
+            if parts[1] not in cat.artist_index:
+                return self._send(404, {"error": {"status": 404, "message": "non existing id"}})
+            return self._send(200, cat.artist(cat.artist_index[parts[1]]))
+        return self._send(404, {"error": {"status": 404, "message": "not found"}})
+
+    # ---- MusicBrainz ----
+    def _musicbrainz(self, parts: List[str], q: Dict[str, str]) -> None:
+        srv, cat = self.server, self.server.catalog
+        if parts != ["artist"]:
+            return self._send(404, {"error": "not found"})
+        srv.count("mb/artist")
+        limit = min(int(q.get("limit", 25)), 100)
+        names = [re.sub(r"\\(.)", r"\1", m) for m in _MB_CLAUSE.findall(q.get("query", ""))]
+        artists = []
+        for name in names:
+            i = cat.artist_by_name.get(name.strip().lower())
+            if i is not None:
+                artists.append(cat.mb_artist(i))
+        artists = artists[:limit]
+        return self._send(200, {"created": "2024-01-01T00:00:00Z", "count": len(artists), "offset": 0, "artists": artists})
+
+
+def start_server(catalog: Catalog, host: str = "127.0.0.1", port: int = 0, **options: Any) -> StandInServer:
+    """Start the stand-in in a daemon thread; `server.server_port` gives the bound port."""
+    srv = StandInServer((host, port), catalog, **options)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Local Spotify/MusicBrainz stand-in for benchmarks.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8900)
+    ap.add_argument("--tracks", type=int, default=1000)
+    ap.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    ap.add_argument("--page-size", type=int, default=50, help="maximum items per page")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="probability of answering 429")
+    ap.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with injected 429s")
+    args = ap.parse_args()
+
+    srv = StandInServer((args.host, args.port), Catalog(args.tracks), latency=args.latency,
+                        page_size=args.page_size, error_rate=args.error_rate, retry_after=args.retry_after)
+    print(f"Stand-in listening on http://{args.host}:{srv.server_port} ({args.tracks} tracks)")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
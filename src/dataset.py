@@ -0,0 +1,126 @@
+"""Shared loader for the cleaned dataset.
+
+Every analysis script and report section should get its data from
+`load_dataset()` rather than calling `pd.read_csv` with its own relative
+path. The loader applies one fixed schema:
+
+- `gender` and `genre_grouped` are categoricals (`genre_grouped` comes from
+  `genre_taxonomy.classify_genres`),
+- popularity, year, duration and album size use the smallest integer width
+  that fits them,
+- names, IDs and raw genres are Arrow-backed strings (plain pandas strings
+  when pyarrow is not installed).
+
+The typed frame is cached as a pickle under `data/cache/`. The cache file
+is named after a hash of the CSV's content and of the schema, so a reload
+skips CSV parsing entirely, and any edit to the CSV produces a new cache
+entry.
+
+Example:
+
+    from dataset import load_dataset
+    df = load_dataset()
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import pickle
+from pathlib import Path
+
+import pandas as pd
+
+from genre_taxonomy import GENRE_GROUPS, classify_genres  # noqa: F401  (GENRE_GROUPS re-exported)
+
+try:
+    import pyarrow  # noqa: F401  (only needed for Arrow-backed strings)
+
+    STRING_DTYPE = pd.StringDtype("pyarrow")
+except ImportError:  # pragma: no cover - depends on the environment
+    STRING_DTYPE = pd.StringDtype("python")
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DATASET_PATH = PROJECT_ROOT / "data" / "processed" / "cleaned_final_dataset.csv"
+CACHE_DIR = PROJECT_ROOT / "data" / "cache"
+
+# Bump when the schema below changes: old cache files are then ignored
+SCHEMA_VERSION = 1
+
+GENDER_CATEGORIES = ["female", "male", "non-binary", "group", "unknown"]
+
+INTEGER_DTYPES = {
+    "track_popularity": "int8",     # 0-100
+    "release_year": "int16",        # 0 = unknown
+    "album_total_tracks": "int16",
+    "duration_ms": "int32",
+}
+STRING_COLUMNS = [
+    "track_id", "track_name", "artist_names", "artist_ids",
+    "album_id", "album_name", "album_release_date", "genre",
+]
+
+logger = logging.getLogger(__name__)
+
+
+def load_dataset(path: Path | str = DATASET_PATH, use_cache: bool = True) -> pd.DataFrame:
+    """Load the cleaned dataset with the fixed schema, from the cache if possible."""
+
+    path = Path(path)
+    digest = _content_hash(path)
+    cache_path = CACHE_DIR / f"{path.stem}-{digest}.pkl"
+
+    if use_cache and cache_path.is_file():
+        with cache_path.open("rb") as fh:
+            return pickle.load(fh)
+
+    df = _read_typed(path)
+
+    if use_cache:
+        _write_cache(df, cache_path, path.stem)
+    return df
+
+
+def _content_hash(path: Path) -> str:
+    """Hash of the file's bytes and SCHEMA_VERSION."""
+
+    h = hashlib.blake2b(f"schema-{SCHEMA_VERSION}".encode(), digest_size=16)
+    with path.open("rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _categorical(values: pd.Series, categories: list[str]) -> pd.Series:
+    """Categorical with a fixed category order; unexpected values are kept, not dropped."""
+
+    extra = sorted(set(values.dropna().unique()) - set(categories))
+    return values.astype(pd.CategoricalDtype(categories + extra))
+
+
+def _read_typed(path: Path) -> pd.DataFrame:
+    """Parse the CSV once and apply the schema."""
+
+    header = pd.read_csv(path, nrows=0).columns
+    dtype = {col: STRING_DTYPE for col in STRING_COLUMNS if col in header}
+    dtype.update({col: t for col, t in INTEGER_DTYPES.items() if col in header})
+    df = pd.read_csv(path, dtype=dtype)
+
+    df["gender"] = _categorical(df["gender"], GENDER_CATEGORIES)
+    df["genre_grouped"] = classify_genres(df["genre"])
+    return df
+
+
+def _write_cache(df: pd.DataFrame, cache_path: Path, stem: str) -> None:
+    """Write the pickle and remove stale caches of the same CSV."""
+
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        for old in CACHE_DIR.glob(f"{stem}-*.pkl"):
+            old.unlink()
+        tmp_path = cache_path.with_suffix(".tmp")
+        with tmp_path.open("wb") as fh:
+            pickle.dump(df, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp_path.replace(cache_path)
+    except OSError as exc:
+        logger.warning("Unable to write dataset cache %s: %s", cache_path, exc)
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+from typing import Dict, Any, Optional, List, Iterable, Tuple
+
+import json
+import sqlite3
+import threading
+import time
+
+_MISSING = object()
+
+
+class DiskCache:
+    """
+    Petit cache clé -> valeur JSON persistant (SQLite), partageable entre threads.
+
+    - une valeur None est un résultat NÉGATIF (ex. album introuvable) : il est mis
+      en cache comme les autres, avec sa propre durée de vie (`negative_ttl`) ;
+    - `ttl` / `negative_ttl` en secondes (None => pas d'expiration) ;
+    - `max_entries` borne la taille : au-delà, les entrées expirées puis les plus
+      anciennes (stored_at) sont supprimées à l'écriture.
+    """
+
+    def __init__(self, path: str, table: str = "entries", ttl: Optional[float] = None, negative_ttl: Optional[float] = None,
+                 max_entries: Optional[int] = None) -> None:
+        self.path = path
+        self.table = table
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT,"
+            " found INTEGER NOT NULL,"
+            " stored_at REAL NOT NULL)"
+        )
+        self._db.execute(f"CREATE INDEX IF NOT EXISTS {table}_stored_at ON {table} (stored_at)")
+        self._db.commit()
+
+    # ---- lecture ----
+    def _fresh(self, found: int, stored_at: float, now: float) -> bool:
+        ttl = self.ttl if found else self.negative_ttl
+        return ttl is None or (now - stored_at) < ttl
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Renvoie {clé: valeur} pour les entrées présentes ET non expirées (valeur None = négatif)."""
+        keys = list(dict.fromkeys(k for k in keys if k))
+        out: Dict[str, Any] = {}
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                cur = self._db.execute(
+                    f"SELECT key, value, found, stored_at FROM {self.table} WHERE key IN ({marks})", chunk
+                )
+                for key, value, found, stored_at in cur:
+                    if self._fresh(found, stored_at, now):
+                        out[key] = json.loads(value) if found else None
+        return out
+
+    def get(self, key: str, default: Any = _MISSING) -> Any:
+        hit = self.get_many([key])
+        if key in hit:
+            return hit[key]
+        if default is _MISSING:
+            raise KeyError(key)
+        return default
+
+    # ---- écriture ----
+    def put_many(self, items: Iterable[Tuple[str, Any]]) -> None:
+        now = time.time()
+        rows: List[Tuple[str, Optional[str], int, float]] = [
+            (k, None if v is None else json.dumps(v, ensure_ascii=False), 0 if v is None else 1, now)
+            for k, v in items if k
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._db.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, found, stored_at) VALUES (?, ?, ?, ?)", rows
+            )
+            if self.max_entries is not None:
+                self._evict(now)
+            self._db.commit()
+
+    def put(self, key: str, value: Any) -> None:
+        self.put_many([(key, value)])
+
+    # ---- maintenance ----
+    def _evict(self, now: float) -> None:
+        # appelé sous self._lock
+        excess = self._db.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0] - self.max_entries
+        if excess <= 0:
+            return
+        for found, ttl in ((1, self.ttl), (0, self.negative_ttl)):
+            if ttl is not None:
+                self._db.execute(f"DELETE FROM {self.table} WHERE found = ? AND stored_at < ?", (found, now - ttl))
+        excess = self._db.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0] - self.max_entries
+        if excess > 0:
+            self._db.execute(
+                f"DELETE FROM {self.table} WHERE key IN (SELECT key FROM {self.table} ORDER BY stored_at LIMIT ?)", (excess,)
+            )
+
+    def purge(self) -> int:
+        """Vide complètement le cache ; renvoie le nombre d'entrées supprimées."""
+        with self._lock:
+            n = self._db.execute(f"DELETE FROM {self.table}").rowcount
+            self._db.commit()
+        return n
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
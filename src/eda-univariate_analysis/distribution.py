@@ -1,10 +1,13 @@
 # EDA - Univariate Analysis
 
-import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 import seaborn as sns
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dataset import load_dataset  # noqa: E402
 
 # --------------------------- SETUP ---------------------------
 
@@ -19,7 +22,7 @@ def save_plot(name):
     print(f"Saved: {filepath}")
 
 
-df = pd.read_csv("../../data/processed/cleaned_final_dataset.csv")
+df = load_dataset()  # typed and cached; includes genre_grouped
 
 sns.set_theme(
     style="whitegrid",
@@ -43,35 +46,8 @@ plt.ylabel("Count")
 save_plot("distribution_track_popularity")
 plt.show()
 
-# --------------------------- GENRE MAPPING & DISTRIBUTION ---------------------------
-
-def map_genre(genre):
-    if pd.isna(genre) or str(genre).strip().lower() in ["n/a", "unknown", ""]:
-        return None
-
-    g = genre.lower()
-
-    if "rock" in g:
-        return "Rock"
-    if "pop" in g or "christmas" in g:
-        return "Pop"
-    if "hip hop" in g or "hip-hop" in g or "rap" in g:
-        return "Hip-Hop/Rap"
-    if any(x in g for x in ["edm", "electronic", "electro", "new wave", "synth"]):
-        return "Electronic/Synth"
-    if any(x in g for x in ["jazz", "motown", "northern soul", "new jack swing"]):
-        return "Jazz"
-    if "metal" in g:
-        return "Metal"
-    if "folk" in g or "country" in g:
-        return "Country"
-    if any(x in g for x in ["r&b", "soul", "doo-wop", "doowop"]):
-        return "R&B/Soul"
-
-    return "Other"
-
+# --------------------------- GENRE DISTRIBUTION ---------------------------
 
-df["genre_grouped"] = df["genre"].apply(map_genre)
 genre_counts = df["genre_grouped"].value_counts(dropna=True)
 
 plt.figure(figsize=(10, 6))
@@ -97,6 +73,7 @@ plt.show()
 # --------------------------- MALE VS FEMALE ONLY ---------------------------
 
 df_binary_gender = df[df["gender"].isin(["male", "female"])]
+df_binary_gender = df_binary_gender.assign(gender=df_binary_gender["gender"].cat.remove_unused_categories())
 
 plt.figure(figsize=(8, 5))
 sns.countplot(data=df_binary_gender, x="gender")
@@ -1,8 +1,12 @@
 import os
+import sys
 import matplotlib.pyplot as plt
 import seaborn as sns
 import pandas as pd
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dataset import load_dataset  # noqa: E402
+
 # Ensure summary_stats folder exists
 IMAGE_DIR = "../../report/images/summary_stats"
 os.makedirs(IMAGE_DIR, exist_ok=True)
@@ -15,8 +19,8 @@ def save_plot(name):
     print(f"Saved: {filepath}")
 
 
-# Load dataset
-df = pd.read_csv("../../data/processed/cleaned_final_dataset.csv")
+# Load dataset (typed and cached; includes genre_grouped)
+df = load_dataset()
 
 key_vars = ["release_year", "genre", "gender", "track_popularity"]
 
@@ -76,35 +80,6 @@ for var in numeric_vars:
 categorical_vars = ["genre", "gender"]
 
 
-def map_genre(genre):
-    if pd.isna(genre) or str(genre).strip().lower() in ["n/a", "unknown", ""]:
-        return None
-
-    g = genre.lower()
-
-    if "rock" in g:
-        return "Rock"
-    if "pop" in g or "christmas" in g:
-        return "Pop"
-    if "hip hop" in g or "hip-hop" in g or "rap" in g:
-        return "Hip-Hop/Rap"
-    if any(x in g for x in ["edm", "electronic", "electro", "new wave", "synth"]):
-        return "Electronic/Synth"
-    if any(x in g for x in ["jazz", "motown", "northern soul", "new jack swing"]):
-        return "Jazz"
-    if "metal" in g:
-        return "Metal"
-    if "folk" in g or "country" in g:
-        return "Country"
-    if any(x in g for x in ["r&b", "soul", "doo-wop", "doowop"]):
-        return "R&B/Soul"
-
-    return "Other"
-
-
-# Apply genre mapping
-df["genre_grouped"] = df["genre"].apply(map_genre)
-
 for var in categorical_vars:
     plt.figure(figsize=(8, 4))
     if var == "genre":
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+from typing import Dict, Any, Optional, List, Tuple, Iterator
+
+import csv
+import datetime as dt
+import os
+
+# pyarrow est optionnel : seul l'export --format parquet/feather en a besoin
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - dépend de l'environnement
+    pa = None
+    pq = None
+
+FORMATS = ("parquet", "feather")
+EXTENSIONS = {"parquet": ".parquet", "feather": ".arrow"}
+CHUNK_ROWS = 50_000   # lignes CSV converties par lot (mémoire bornée)
+LIST_SEP = ";"        # séparateur de artist_names / artist_ids dans le CSV
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise ImportError("pyarrow est requis pour l'export parquet/feather : pip install pyarrow")
+
+
+# ------------------------ Schéma fixe de l'export ------------------------
+def export_schema(with_source: bool = False) -> "pa.Schema":
+    _require_pyarrow()
+    fields = [
+        pa.field("track_id", pa.string()),
+        pa.field("track_name", pa.string()),
+        pa.field("track_popularity", pa.int8()),                # 0..100
+        pa.field("duration_ms", pa.int32()),
+        pa.field("artist_names", pa.list_(pa.string())),
+        pa.field("artist_ids", pa.list_(pa.string())),
+        pa.field("album_id", pa.string()),
+        pa.field("album_name", pa.string()),
+        pa.field("album_release_date", pa.date32()),
+        pa.field("album_release_date_precision", pa.string()),  # year / month / day
+        pa.field("album_total_tracks", pa.int16()),
+        pa.field("added_at", pa.timestamp("s", tz="UTC")),
+    ]
+    if with_source:
+        fields.append(pa.field("source_playlist", pa.string()))
+    return pa.schema(fields)
+
+
+# ------------------------ Parsing des valeurs texte ------------------------
+def parse_release_date(value: Optional[str]) -> Tuple[Optional[dt.date], Optional[str]]:
+    """
+    Spotify renvoie 'YYYY', 'YYYY-MM' ou 'YYYY-MM-DD' selon release_date_precision :
+    la précision se déduit donc de la forme de la chaîne.
+    """
+    value = (value or "").strip()[:10]
+    try:
+        if len(value) == 4:
+            return dt.date(int(value), 1, 1), "year"
+        if len(value) == 7:
+            return dt.date(int(value[:4]), int(value[5:7]), 1), "month"
+        if len(value) == 10:
+            return dt.date.fromisoformat(value), "day"
+    except ValueError:
+        pass
+    return None, None
+
+
+def _int(value: Optional[str]) -> Optional[int]:
+    value = (value or "").strip()
+    return int(float(value)) if value else None
+
+
+def _list(value: Optional[str]) -> List[str]:
+    return [p.strip() for p in (value or "").split(LIST_SEP) if p.strip()]
+
+
+def _timestamp(value: Optional[str]) -> Optional[dt.datetime]:
+    value = (value or "").strip()
+    if not value:
+        return None
+    return dt.datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _columns(rows: List[Dict[str, str]], with_source: bool) -> Dict[str, List[Any]]:
+    dates = [parse_release_date(r.get("album_release_date")) for r in rows]
+    cols: Dict[str, List[Any]] = {
+        "track_id": [r.get("track_id") or None for r in rows],
+        "track_name": [r.get("track_name") for r in rows],
+        "track_popularity": [_int(r.get("track_popularity")) for r in rows],
+        "duration_ms": [_int(r.get("duration_ms")) for r in rows],
+        "artist_names": [_list(r.get("artist_names")) for r in rows],
+        "artist_ids": [_list(r.get("artist_ids")) for r in rows],
+        "album_id": [r.get("album_id") or None for r in rows],
+        "album_name": [r.get("album_name") for r in rows],
+        "album_release_date": [d for d, _ in dates],
+        "album_release_date_precision": [p for _, p in dates],
+        "album_total_tracks": [_int(r.get("album_total_tracks")) for r in rows],
+        "added_at": [_timestamp(r.get("added_at")) for r in rows],
+    }
+    if with_source:
+        cols["source_playlist"] = [r.get("source_playlist") or None for r in rows]
+    return cols
+
+
+def _iter_chunks(reader: csv.DictReader, size: int) -> Iterator[List[Dict[str, str]]]:
+    chunk: List[Dict[str, str]] = []
+    for row in reader:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# ------------------------ Conversion CSV -> Parquet / Arrow IPC ------------------------
+def columnar_path(csv_path: str, fmt: str) -> str:
+    return os.path.splitext(csv_path)[0] + EXTENSIONS[fmt]
+
+
+def csv_to_columnar(csv_path: str, fmt: str = "parquet", out_path: Optional[str] = None, chunk_rows: int = CHUNK_ROWS) -> str:
+    """
+    Convertit un CSV produit par main.py en fichier typé (schéma fixe), par lots de `chunk_rows`.
+    'feather' écrit un fichier Arrow IPC non compressé, lisible en memory-map sans copie.
+    """
+    _require_pyarrow()
+    if fmt not in FORMATS:
+        raise ValueError(f"Format inconnu: {fmt} (attendu: {', '.join(FORMATS)})")
+    out_path = out_path or columnar_path(csv_path, fmt)
+
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        with_source = "source_playlist" in (reader.fieldnames or [])
+        schema = export_schema(with_source)
+        tmp_path = out_path + ".tmp"
+        if fmt == "parquet":
+            writer = pq.ParquetWriter(tmp_path, schema)
+        else:
+            sink = pa.OSFile(tmp_path, "wb")
+            writer = pa.ipc.new_file(sink, schema)
+        try:
+            for chunk in _iter_chunks(reader, chunk_rows):
+                writer.write_table(pa.Table.from_pydict(_columns(chunk, with_source), schema=schema))
+        finally:
+            writer.close()
+            if fmt == "feather":
+                sink.close()
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+def read_columnar(path: str, columns: Optional[List[str]] = None) -> "pa.Table":
+    """Lecture sans parsing : memory-map pour Arrow IPC, lecture colonnaire pour Parquet."""
+    _require_pyarrow()
+    if path.endswith(EXTENSIONS["feather"]):
+        table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()  # les buffers gardent le mmap ouvert
+        return table.select(columns) if columns else table
+    return pq.read_table(path, columns=columns, memory_map=True)
@@ -0,0 +1,117 @@
+"""Genre taxonomy: Spotify genre strings -> the report's genre groups.
+
+The keyword rules below are compiled into a single regular expression.
+Every alternative sits inside a lookahead, so one `finditer` pass over a
+genre string reports each keyword occurrence, even where keywords overlap
+("northern soul" hits both Jazz and R&B/Soul). Classification works on the
+distinct genre strings only and the result is mapped back to the rows
+through their codes, so the cost depends on the number of distinct genres,
+not on the number of rows.
+
+- `classify_genres` gives the primary group per row (a categorical). Rules
+  are tried in RULES order, so "pop rock" is Rock, as in the original
+  `map_genre` of the EDA scripts.
+- `genre_buckets` gives every matched group per row (one boolean column per
+  group).
+
+Example:
+
+    from genre_taxonomy import classify_genres
+    df["genre_grouped"] = classify_genres(df["genre"])
+"""
+
+from __future__ import annotations
+
+import re
+
+import numpy as np
+import pandas as pd
+
+# Ordered: the first group whose keywords appear in a genre is its primary group
+RULES = [
+    ("Rock", ["rock"]),
+    ("Pop", ["pop", "christmas"]),
+    ("Hip-Hop/Rap", ["hip hop", "hip-hop", "rap"]),
+    ("Electronic/Synth", ["edm", "electronic", "electro", "new wave", "synth"]),
+    ("Jazz", ["jazz", "motown", "northern soul", "new jack swing"]),
+    ("Metal", ["metal"]),
+    ("Country", ["folk", "country"]),
+    ("R&B/Soul", ["r&b", "soul", "doo-wop", "doowop"]),
+]
+OTHER = "Other"
+GENRE_GROUPS = [group for group, _ in RULES] + [OTHER]
+
+# Values that mean "no genre": classified as missing, not as Other
+MISSING_VALUES = {"n/a", "unknown", ""}
+
+# One named group per rule, all inside a lookahead: a match is zero-width, so
+# the scan moves on by one character and overlapping keywords are all found
+_PATTERN = re.compile(
+    "(?=" + "|".join(
+        f"(?P<g{i}>{'|'.join(re.escape(k) for k in sorted(keywords, key=len, reverse=True))})"
+        for i, (_, keywords) in enumerate(RULES)
+    ) + ")"
+)
+
+
+def _matched_rules(genre: str) -> set[int]:
+    """Indices in RULES of every rule with a keyword in `genre` (lowercased)."""
+
+    return {int(m.lastgroup[1:]) for m in _PATTERN.finditer(genre)}
+
+
+def _is_missing(genre) -> bool:
+    return pd.isna(genre) or str(genre).strip().lower() in MISSING_VALUES
+
+
+def classify_genre(genre) -> str | None:
+    """Primary group of a single genre string (None if it is missing/unknown)."""
+
+    if _is_missing(genre):
+        return None
+    matched = _matched_rules(str(genre).lower())
+    return RULES[min(matched)][0] if matched else OTHER
+
+
+def match_genre(genre) -> list[str]:
+    """All groups matched by a single genre string, in RULES order ([] if missing)."""
+
+    if _is_missing(genre):
+        return []
+    matched = _matched_rules(str(genre).lower())
+    return [RULES[i][0] for i in sorted(matched)] or [OTHER]
+
+
+def _distinct_matches(genres: pd.Series) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Row codes, and per distinct genre: primary group index (-1 if missing) and match matrix."""
+
+    codes, uniques = pd.factorize(genres)
+    primary = np.full(len(uniques), -1, dtype=np.int8)
+    matrix = np.zeros((len(uniques), len(GENRE_GROUPS)), dtype=bool)
+    for i, genre in enumerate(uniques):
+        if _is_missing(genre):
+            continue
+        matched = _matched_rules(str(genre).lower()) or {len(RULES)}  # OTHER is last
+        primary[i] = min(matched)
+        matrix[i, list(matched)] = True
+    return codes, primary, matrix
+
+
+def classify_genres(genres: pd.Series) -> pd.Series:
+    """Primary group per row, as a categorical over GENRE_GROUPS (NaN when missing/unknown)."""
+
+    codes, primary, _ = _distinct_matches(genres)
+    # factorize gives -1 for NaN rows: append a -1 slot so they stay missing
+    row_codes = np.append(primary, -1)[codes]
+    return pd.Series(
+        pd.Categorical.from_codes(row_codes, categories=GENRE_GROUPS),
+        index=genres.index, name="genre_grouped",
+    )
+
+
+def genre_buckets(genres: pd.Series) -> pd.DataFrame:
+    """One boolean column per group in GENRE_GROUPS: True where the row's genre matches it."""
+
+    codes, _, matrix = _distinct_matches(genres)
+    rows = np.vstack([matrix, np.zeros((1, len(GENRE_GROUPS)), dtype=bool)])[codes]
+    return pd.DataFrame(rows, index=genres.index, columns=GENRE_GROUPS)
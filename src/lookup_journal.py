@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from typing import Dict, Any, Iterable, Tuple
+
+import json
+import os
+import threading
+
+
+class LookupJournal:
+    """
+    Journal JSONL (une résolution par ligne, en ajout seul) des lookups API terminés.
+
+    Chaque ligne vaut {"kind": ..., "key": ..., "value": ...} et est flushée dès l'écriture :
+    après un crash, load() relit tout ce qui a été résolu (une dernière ligne tronquée est
+    ignorée) et un run `--resume` ne redemande que les clés absentes.
+    """
+
+    def __init__(self, path: str, resume: bool = False) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self.loaded: Dict[str, Dict[str, Any]] = self.load(path) if resume else {}
+        self._f = open(path, "a" if resume else "w", encoding="utf-8")
+        if resume and self._f.tell() > 0:
+            self._f.write("\n")  # isole une éventuelle ligne tronquée du crash précédent
+
+    @staticmethod
+    def load(path: str) -> Dict[str, Dict[str, Any]]:
+        """{kind: {key: value}} ; la dernière valeur écrite pour une clé l'emporte."""
+        out: Dict[str, Dict[str, Any]] = {}
+        if not os.path.exists(path):
+            return out
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue  # ligne partielle (crash pendant l'écriture)
+                out.setdefault(rec["kind"], {})[rec["key"]] = rec.get("value")
+        return out
+
+    def record_many(self, kind: str, items: Iterable[Tuple[str, Any]]) -> None:
+        lines = "".join(json.dumps({"kind": kind, "key": k, "value": v}, ensure_ascii=False) + "\n" for k, v in items)
+        if not lines:
+            return
+        with self._lock:
+            self._f.write(lines)
+            self._f.flush()
+
+    def record(self, kind: str, key: str, value: Any) -> None:
+        self.record_many(kind, [(key, value)])
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._f.closed:
+                self._f.close()
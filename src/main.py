@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Dict, Optional, Any, List
+from typing import Dict, Optional, Any, List, Iterator, Tuple
 
 import os
 import urllib.parse
@@ -17,6 +17,14 @@ import time
 import json
 import csv
 import hashlib
+import argparse
+import queue
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import spotify_http
+import export_columnar
+from disk_cache import DiskCache
 
 # ---- Sélection des exports ----
 spotify_ID = "c62c55975a5f467a89a13bcb6fdcb76e"  # id client spotify developer
@@ -27,7 +35,7 @@ playlist_ID: str = "4RFQsq8DrkJmNfR5l2BwfO"  # ID Spotify de la playlist à expo
 # ---- OAuth/Spotify ----
 SPOTIFY_AUTH_URL = "https://accounts.spotify.com/authorize"
 SPOTIFY_TOKEN_URL = "https://accounts.spotify.com/api/token"
-SPOTIFY_API_BASE = "https://api.spotify.com/v1"
+SPOTIFY_API_BASE = os.getenv("SPOTIFY_API_BASE", "https://api.spotify.com/v1")  # surchargeable (stand-in local des benchmarks)
 
 # Renseigne ton Client ID via variable d'env (recommandé)
 CLIENT_ID = os.getenv("SPOTIFY_CLIENT_ID", spotify_ID)
@@ -45,9 +53,24 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 CSV_LIKED_PATH = os.path.join(BASE_DIR, "liked_tracks.csv")
 TOKEN_CACHE_PATH = os.path.join(BASE_DIR, "spotify_token_cache.json")
 
+# ---- Pagination concurrente : nb de pages demandées en parallèle (1 => séquentiel) ----
+PAGE_WORKERS = int(os.getenv("SPOTIFY_PAGE_WORKERS", "8"))
+
+# ---- Export multi-playlists : nb de playlists récupérées en parallèle ----
+PLAYLIST_WORKERS = int(os.getenv("SPOTIFY_PLAYLIST_WORKERS", "4"))
+PLAYLIST_QUEUE_PAGES = 4  # pages récupérées d'avance par playlist, en attente d'écriture
+CSV_COMBINED_PATH = os.path.join(BASE_DIR, "all_playlists_combined.csv")
+
 # ---- Cache local pour total_tracks d'un album ----
 _album_total_cache: Dict[str, Optional[int]] = {}
 
+# ---- Cache persistant des albums (SQLite à côté de spotify_token_cache.json) ----
+ALBUM_CACHE_PATH = os.path.join(BASE_DIR, "album_cache.sqlite")
+ALBUM_CACHE_TTL_DAYS = float(os.getenv("SPOTIFY_ALBUM_CACHE_TTL_DAYS", "30"))          # albums trouvés
+ALBUM_CACHE_NEGATIVE_TTL_DAYS = float(os.getenv("SPOTIFY_ALBUM_CACHE_NEG_TTL_DAYS", "1"))  # albums introuvables
+_album_store: Optional[DiskCache] = None   # None => cache disque désactivé
+_album_stats: Dict[str, int] = {"disk_hits": 0, "fetched": 0}
+
 
 # ------------------------ Utilitaires PKCE & OAuth ------------------------
 def _b64url_no_pad(data: bytes) -> str:
@@ -203,32 +226,34 @@ def get_user_token_via_pkce(client_id: str, redirect_uri: str, scope: str, timeo
 
 
 # ------------------------ Appels API génériques avec gestion 401/429 ------------------------
+_token_lock = threading.Lock()  # un seul refresh à la fois quand les pages partent en parallèle
+
+
 def auth_header(access_token: str) -> Dict[str, str]:
     return {"Authorization": f"Bearer {access_token}", "Accept": "application/json"}
 
 
 def api_request(method: str, path: str, access_token: str, params: Optional[Dict[str, Any]] = None, json_body: Optional[Dict[str, Any]] = None, timeout: int = 15) -> requests.Response:
     url = f"{SPOTIFY_API_BASE}{path if path.startswith('/') else '/' + path}"
-    r = requests.request(method.upper(), url, headers=auth_header(access_token), params=params, json=json_body, timeout=timeout)
+    # Session partagée (pool keep-alive) au lieu d'une connexion TCP+TLS par appel
+    r = spotify_http.request(method, url, headers=auth_header(access_token), params=params, json=json_body, timeout=timeout)
     return r
 
 
 def api_request_with_reauth(method: str, path: str, token_cache: Dict[str, Any], params: Optional[Dict[str, Any]] = None, json_body: Optional[Dict[str, Any]] = None, timeout: int = 15) -> Dict[str, Any]:
     # 1er essai
-    r = api_request(method, path, token_cache["access_token"], params, json_body, timeout)
+    used_token = token_cache["access_token"]
+    r = api_request(method, path, used_token, params, json_body, timeout)
     if r.status_code == 401 and "refresh_token" in token_cache:
-        # Rafraîchit et retente 1 fois
-        new_tok = refresh_access_token(token_cache["refresh_token"], CLIENT_ID)
-        token_cache.update(new_tok)
-        save_token_cache(token_cache)
-        r = api_request(method, path, token_cache["access_token"], params, json_body, timeout)
-
-    # 429 => attend Retry-After si présent, puis retente 1 fois
-    if r.status_code == 429:
-        retry_after = int(r.headers.get("Retry-After", "1"))
-        time.sleep(max(retry_after, 1))
+        # Rafraîchit (sauf si un autre thread vient de le faire) et retente 1 fois
+        with _token_lock:
+            if token_cache["access_token"] == used_token:
+                new_tok = refresh_access_token(token_cache["refresh_token"], CLIENT_ID)
+                token_cache.update(new_tok)
+                save_token_cache(token_cache)
         r = api_request(method, path, token_cache["access_token"], params, json_body, timeout)
 
+    # 429/5xx : déjà retentés par le limiteur partagé (spotify_http.request)
     r.raise_for_status()
     try:
         return r.json()
@@ -236,7 +261,64 @@ def api_request_with_reauth(method: str, path: str, token_cache: Dict[str, Any],
         return {"raw": r.text}
 
 
-# ------------------------ Helpers album_total_tracks (vérif via /albums/{id}) ------------------------
+# ------------------------ Helpers album_total_tracks (vérif via /albums) ------------------------
+ALBUMS_BATCH_SIZE = 20  # API: /albums?ids= accepte au plus 20 IDs
+
+
+def open_album_cache(path: str = ALBUM_CACHE_PATH) -> DiskCache:
+    global _album_store
+    day = 24 * 3600
+    _album_store = DiskCache(path, table="albums", ttl=ALBUM_CACHE_TTL_DAYS * day, negative_ttl=ALBUM_CACHE_NEGATIVE_TTL_DAYS * day)
+    return _album_store
+
+
+def close_album_cache() -> None:
+    global _album_store
+    if _album_store is not None:
+        _album_store.close()
+        _album_store = None
+
+
+def _load_albums_from_disk(album_ids: List[str]) -> List[str]:
+    """Complète _album_total_cache depuis le cache disque ; renvoie les IDs encore inconnus."""
+    if _album_store is None or not album_ids:
+        return album_ids
+    hits = _album_store.get_many(album_ids)
+    for aid, album in hits.items():
+        _album_total_cache[aid] = (album or {}).get("total_tracks")
+    _album_stats["disk_hits"] += len(hits)
+    return [aid for aid in album_ids if aid not in hits]
+
+
+def _store_albums(albums: Dict[str, Optional[Dict[str, Any]]]) -> None:
+    """Enregistre des albums fraîchement demandés (None = album introuvable, mis en cache négatif)."""
+    for aid, album in albums.items():
+        _album_total_cache[aid] = (album or {}).get("total_tracks")
+    _album_stats["fetched"] += len(albums)
+    if _album_store is not None:
+        _album_store.put_many(albums.items())
+
+
+def prefetch_album_totals(token_cache: Dict[str, Any], album_ids: List[Optional[str]], market: Optional[str] = None) -> None:
+    """
+    Remplit _album_total_cache pour tous les albums pas encore connus,
+    par lots de 20 via l'endpoint multi-albums (/albums?ids=...).
+    """
+    missing = list(dict.fromkeys(aid for aid in album_ids if aid and aid not in _album_total_cache))
+    missing = _load_albums_from_disk(missing)
+
+    for i in range(0, len(missing), ALBUMS_BATCH_SIZE):
+        chunk = missing[i:i + ALBUMS_BATCH_SIZE]
+        params = {"ids": ",".join(chunk), "market": market}
+        data = api_request_with_reauth("GET", "/albums", token_cache, params=params)
+        # L'API renvoie les albums dans l'ordre des IDs, avec null pour un ID inconnu
+        found: Dict[str, Optional[Dict[str, Any]]] = {aid: None for aid in chunk}
+        for aid, album in zip(chunk, data.get("albums") or []):
+            if album:
+                found[aid] = {"total_tracks": album.get("total_tracks")}
+        _store_albums(found)
+
+
 def get_album_total_tracks_exact(token_cache: Dict[str, Any], album_id: Optional[str], market: Optional[str] = None) -> Optional[int]:
     """
     Retourne total_tracks depuis l'endpoint ALBUM COMPLET (cache local),
@@ -246,83 +328,377 @@ def get_album_total_tracks_exact(token_cache: Dict[str, Any], album_id: Optional
         return None
     if album_id in _album_total_cache:
         return _album_total_cache[album_id]
+    if not _load_albums_from_disk([album_id]):
+        return _album_total_cache[album_id]
     album = api_request_with_reauth("GET", f"/albums/{album_id}", token_cache, params={"market": market})
-    total = album.get("total_tracks")
-    _album_total_cache[album_id] = total
-    return total
+    _store_albums({album_id: {"total_tracks": album.get("total_tracks")}})
+    return _album_total_cache[album_id]
 
 
-# ------------------------ Extraction "Liked Songs" ------------------------
-def get_all_liked_tracks(token_cache: Dict[str, Any], market: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+# ------------------------ Items de page -> lignes CSV ------------------------
+def build_rows(token_cache: Dict[str, Any], items: List[Dict[str, Any]], market: Optional[str] = None) -> List[Dict[str, Any]]:
+    items = [it for it in items if (it.get("track") or {}).get("type") == "track"]
+
+    # Un seul passage groupé sur /albums pour les albums absents du cache
+    prefetch_album_totals(token_cache, [(it["track"].get("album") or {}).get("id") for it in items], market)
+
     rows: List[Dict[str, Any]] = []
-    offset = 0
+    for it in items:
+        tr = it["track"]
+        album = tr.get("album") or {}
+        artists = tr.get("artists") or []
+        artist_names = "; ".join([a.get("name", "") for a in artists if a])
+        artist_ids = "; ".join([a.get("id", "") for a in artists if a])
+
+        album_id = album.get("id")
+        # Vérifie/corrige total_tracks via /albums
+        album_total_tracks = get_album_total_tracks_exact(token_cache, album_id, market)
+        if album_total_tracks is None:
+            album_total_tracks = album.get("total_tracks")
+
+        rows.append({
+            # --- Colonnes exportées ---
+            "track_id": tr.get("id"),
+            "track_name": tr.get("name"),
+            "track_popularity": tr.get("popularity"),
+            "duration_ms": tr.get("duration_ms"),
+            "artist_names": artist_names,
+            "artist_ids": artist_ids,
+            "album_id": album_id,
+            "album_name": album.get("name"),
+            "album_release_date": album.get("release_date"),
+            "album_total_tracks": album_total_tracks,
+            "added_at": it.get("added_at"),
+        })
+    return rows
+
+
+# ------------------------ Pagination (séquentielle ou concurrente) ------------------------
+def iter_page_rows(
+    token_cache: Dict[str, Any],
+    path: str,
+    params: Dict[str, Any],
+    market: Optional[str] = None,
+    limit: int = 50,
+    workers: int = PAGE_WORKERS,
+    start_offset: int = 0,
+) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+    """
+    Parcourt un endpoint paginé (offset/limit) et renvoie, DANS L'ORDRE des offsets,
+    des tuples (offset_suivant, lignes_de_la_page).
+
+    La 1re page donne `total` : les offsets restants sont alors demandés par un pool
+    borné de `workers` threads. Chaque worker construit aussi les lignes de sa page
+    (lots /albums compris), donc les albums des pages suivantes sont résolus en avance.
+    `start_offset` permet de reprendre un export interrompu.
+    """
     limit = max(1, min(int(limit), 50))  # API: 1..50
 
-    while True:
-        params = {"limit": limit, "offset": offset}
-        if market:
-            params["market"] = market
-        page = api_request_with_reauth("GET", "/me/tracks", token_cache, params=params)
+    def fetch(offset: int, size: int = limit) -> Dict[str, Any]:
+        p = dict(params, limit=size, offset=offset)
+        return api_request_with_reauth("GET", path, token_cache, params=p)
 
-        items = page.get("items") or []
-        if not items:
-            break
+    def fetch_rows(offset: int, size: int = limit) -> Tuple[int, List[Dict[str, Any]]]:
+        items = fetch(offset, size).get("items") or []
+        return len(items), build_rows(token_cache, items, market)
 
-        for it in items:
-            tr = it.get("track") or {}
-            if not tr or tr.get("type") != "track":
+    page = fetch(start_offset)
+    items = page.get("items") or []
+    if not items:
+        return
+    offset = start_offset + len(items)
+    yield offset, build_rows(token_cache, items, market)
+
+    total = page.get("total")
+    if workers <= 1 or not isinstance(total, int):
+        # Mode séquentiel : on suit `next` page par page
+        while page.get("next"):
+            page = fetch(offset)
+            items = page.get("items") or []
+            if not items:
+                break
+            offset += len(items)
+            yield offset, build_rows(token_cache, items, market)
+        return
+
+    # Mode concurrent : fenêtre bornée de pages en vol, restituées dans l'ordre.
+    # Le pas vient de la 1re page (le serveur peut plafonner `limit` en dessous de la demande).
+    stride = len(items)
+    offsets = iter(range(offset, total, stride))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        in_flight: deque = deque()
+        for off in offsets:
+            in_flight.append((off, pool.submit(fetch_rows, off, stride)))
+            if len(in_flight) >= workers * 2:
+                break
+        while in_flight:
+            off, fut = in_flight.popleft()
+            n_items, rows = fut.result()
+            nxt = next(offsets, None)
+            if nxt is not None:
+                in_flight.append((nxt, pool.submit(fetch_rows, nxt, stride)))
+            if not n_items:
                 continue
-            album = tr.get("album") or {}
-            artists = tr.get("artists") or []
-            artist_names = "; ".join([a.get("name", "") for a in artists if a])
-            artist_ids = "; ".join([a.get("id", "") for a in artists if a])
-
-            album_id = album.get("id")
-            # Vérifie/corrige total_tracks via /albums/{id}
-            album_total_tracks = get_album_total_tracks_exact(token_cache, album_id, market)
-            if album_total_tracks is None:
-                album_total_tracks = album.get("total_tracks")
-
-            rows.append({
-                # --- Colonnes exportées ---
-                "track_id": tr.get("id"),
-                "track_name": tr.get("name"),
-                "track_popularity": tr.get("popularity"),
-                "duration_ms": tr.get("duration_ms"),
-                "artist_names": artist_names,
-                "artist_ids": artist_ids,
-                "album_id": album_id,
-                "album_name": album.get("name"),
-                "album_release_date": album.get("release_date"),
-                "album_total_tracks": album_total_tracks,
-            })
-
-        offset += len(items)
-        if not page.get("next"):
-            break
+            pos = off + n_items
+            yield pos, rows
+            # Page plus courte que prévu : on comble le trou en suivant les offsets un à un
+            end = min(off + stride, total)
+            while pos < end:
+                n_items, rows = fetch_rows(pos, end - pos)
+                if not n_items:
+                    break
+                pos += n_items
+                yield pos, rows
 
+
+# ------------------------ Extraction "Liked Songs" ------------------------
+def get_all_liked_tracks(token_cache: Dict[str, Any], market: Optional[str] = None, limit: int = 50, workers: int = PAGE_WORKERS) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = []
+    params: Dict[str, Any] = {}
+    if market:
+        params["market"] = market
+    for _, page_rows in iter_page_rows(token_cache, "/me/tracks", params, market, limit, workers):
+        rows.extend(page_rows)
     return rows
 
 
+# N'écrit QUE les colonnes demandées
+FIELDNAMES = [
+    "track_id",
+    "track_name",
+    "track_popularity",
+    "duration_ms",
+    "artist_names",
+    "artist_ids",
+    "album_id",
+    "album_name",
+    "album_release_date",
+    "album_total_tracks",
+    "added_at",
+]
+
+
 def write_csv(rows: List[Dict[str, Any]], csv_path: str) -> None:
-    # N'écrit QUE les colonnes demandées
-    fieldnames = [
-        "track_id",
-        "track_name",
-        "track_popularity",
-        "duration_ms",
-        "artist_names",
-        "artist_ids",
-        "album_id",
-        "album_name",
-        "album_release_date",
-        "album_total_tracks",
-    ]
     with open(csv_path, "w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=fieldnames)
+        w = csv.DictWriter(f, fieldnames=FIELDNAMES)
         w.writeheader()
         for row in rows:
-            w.writerow({k: row.get(k) for k in fieldnames})
+            w.writerow({k: row.get(k) for k in FIELDNAMES})
+
+
+# ------------------------ Export CSV en flux + reprise ------------------------
+CHECKPOINT_EVERY = 5  # pages entre deux checkpoints (fsync du CSV + offset sur disque)
+
+
+class CsvExportWriter:
+    """
+    Écrit les lignes page par page (mémoire bornée) et note, dans un fichier annexe
+    `<csv>.checkpoint.json`, le dernier offset terminé et la taille du CSV à ce moment.
+
+    Si un checkpoint compatible (`meta` identique) existe, le CSV est tronqué à la taille
+    enregistrée et `start_offset` indique où reprendre la pagination.
+    """
+
+    def __init__(self, csv_path: str, meta: Optional[Dict[str, Any]] = None, resume: bool = True,
+                 fieldnames: Optional[List[str]] = None, checkpoint_every: int = CHECKPOINT_EVERY) -> None:
+        self.csv_path = csv_path
+        self.checkpoint_path = csv_path + ".checkpoint.json"
+        self.meta = meta or {}
+        self.fieldnames = fieldnames or FIELDNAMES
+        self.checkpoint_every = max(1, checkpoint_every)
+        self.start_offset = 0
+        self.rows_written = 0
+        self._pages = 0
+        self._offset = 0
+
+        ckpt = self._load_checkpoint() if resume else None
+        if ckpt and os.path.exists(csv_path) and os.path.getsize(csv_path) >= ckpt["bytes"]:
+            self.start_offset = self._offset = ckpt["offset"]
+            self.rows_written = ckpt["rows"]
+            self._f = open(csv_path, "r+", newline="", encoding="utf-8")
+            self._f.truncate(ckpt["bytes"])  # supprime les lignes écrites après le dernier checkpoint
+            self._f.seek(ckpt["bytes"])
+            self._w = csv.DictWriter(self._f, fieldnames=self.fieldnames)
+        else:
+            self._f = open(csv_path, "w", newline="", encoding="utf-8")
+            self._w = csv.DictWriter(self._f, fieldnames=self.fieldnames)
+            self._w.writeheader()
+            self._save_checkpoint()
+
+    def _load_checkpoint(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                ckpt = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if ckpt.get("meta") != self.meta or ckpt.get("fieldnames") != self.fieldnames:
+            return None
+        return ckpt
+
+    def _save_checkpoint(self) -> None:
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        ckpt = {
+            "offset": self._offset,
+            "rows": self.rows_written,
+            "bytes": self._f.tell(),
+            "meta": self.meta,
+            "fieldnames": self.fieldnames,
+        }
+        tmp = self.checkpoint_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(ckpt, f)
+        os.replace(tmp, self.checkpoint_path)
+
+    def write_page(self, next_offset: int, rows: List[Dict[str, Any]]) -> None:
+        for row in rows:
+            self._w.writerow({k: row.get(k) for k in self.fieldnames})
+        self.rows_written += len(rows)
+        self._offset = next_offset
+        self._pages += 1
+        if self._pages % self.checkpoint_every == 0:
+            self._save_checkpoint()
+        else:
+            self._f.flush()
+
+    def close(self, completed: bool = False) -> None:
+        if self._f.closed:
+            return
+        if completed:
+            self._f.close()
+            if os.path.exists(self.checkpoint_path):
+                os.remove(self.checkpoint_path)
+        else:
+            self._save_checkpoint()
+            self._f.close()
+
+
+def export_pages_csv(
+    token_cache: Dict[str, Any],
+    path: str,
+    params: Dict[str, Any],
+    csv_path: str,
+    market: Optional[str] = None,
+    limit: int = 50,
+    workers: int = PAGE_WORKERS,
+    resume: bool = True,
+    meta: Optional[Dict[str, Any]] = None,
+) -> int:
+    """Pagine `path` et écrit chaque page dès qu'elle est prête ; renvoie le nb de lignes du CSV."""
+    writer = CsvExportWriter(csv_path, meta=dict(meta or {}, path=path), resume=resume)
+    if writer.start_offset:
+        print(f"Reprise de {os.path.basename(csv_path)} à l'offset {writer.start_offset} ({writer.rows_written} lignes déjà écrites)")
+    completed = False
+    try:
+        for next_offset, rows in iter_page_rows(token_cache, path, params, market, limit, workers, writer.start_offset):
+            writer.write_page(next_offset, rows)
+        completed = True
+    finally:
+        writer.close(completed)
+    return writer.rows_written
+
+
+def liked_tracks_meta(token_cache: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Empreinte des Liked Songs pour le checkpoint : `total` et added_at du titre le plus récent.
+    La liste est triée du plus récent au plus ancien, donc un like/unlike entre le crash et la
+    reprise décale tous les offsets ; l'empreinte change alors et l'export repart de zéro.
+    """
+    page = api_request_with_reauth("GET", "/me/tracks", token_cache, params=dict(params, limit=1, offset=0))
+    items = page.get("items") or []
+    return {"total": page.get("total"), "newest_added_at": (items[0] or {}).get("added_at") if items else None}
+
+
+def export_liked_tracks_csv(
+    token_cache: Dict[str, Any],
+    csv_path: str = CSV_LIKED_PATH,
+    market: Optional[str] = None,
+    limit: int = 50,
+    workers: int = PAGE_WORKERS,
+    resume: bool = True,
+) -> str:
+    params: Dict[str, Any] = {}
+    if market:
+        params["market"] = market
+    meta = liked_tracks_meta(token_cache, params)
+    export_pages_csv(token_cache, "/me/tracks", params, csv_path, market, limit, workers, resume, meta)
+    return csv_path
+
+# ------------------------ Synchro incrémentale des Liked Songs (added_at) ------------------------
+def _sync_state_path(csv_path: str) -> str:
+    return csv_path + ".sync.json"
+
+
+def _newest_added_at(csv_path: str) -> Optional[str]:
+    """Plus récent added_at du CSV (None si le CSV n'a pas la colonne)."""
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        if "added_at" not in (reader.fieldnames or []):
+            return None
+        return max((r["added_at"] for r in reader if r.get("added_at")), default=None)
+
+
+def _save_sync_state(csv_path: str, newest: Optional[str]) -> None:
+    with open(_sync_state_path(csv_path), "w", encoding="utf-8") as f:
+        json.dump({"newest_added_at": newest, "synced_at": int(time.time())}, f, indent=2)
+
+
+def sync_liked_tracks_csv(
+    token_cache: Dict[str, Any],
+    csv_path: str = CSV_LIKED_PATH,
+    market: Optional[str] = None,
+    limit: int = 50,
+) -> int:
+    """
+    Synchro incrémentale : /me/tracks renvoie les titres du plus récent au plus ancien,
+    on s'arrête donc à la première page qui atteint le dernier added_at déjà exporté,
+    puis on fusionne les nouveautés en tête du CSV existant. Renvoie le nb de nouvelles lignes.
+
+    Sans état utilisable (1er run, ancien CSV sans added_at, export complet interrompu),
+    on fait un export complet. Les titres retirés des Liked Songs ne sont vus que par un export complet.
+    """
+    newest: Optional[str] = None
+    if os.path.exists(csv_path) and not os.path.exists(csv_path + ".checkpoint.json"):
+        try:
+            with open(_sync_state_path(csv_path), "r", encoding="utf-8") as f:
+                newest = json.load(f).get("newest_added_at")
+        except (OSError, ValueError):
+            newest = _newest_added_at(csv_path)
+
+    params: Dict[str, Any] = {"market": market} if market else {}
+    if not newest:
+        meta = liked_tracks_meta(token_cache, params)
+        n = export_pages_csv(token_cache, "/me/tracks", params, csv_path, market, limit, meta=meta)
+        _save_sync_state(csv_path, _newest_added_at(csv_path))
+        return n
+
+    # Pages séquentielles : on veut pouvoir s'arrêter dès qu'on rejoint l'export précédent
+    new_rows: List[Dict[str, Any]] = []
+    for _, rows in iter_page_rows(token_cache, "/me/tracks", params, market, limit, workers=1):
+        fresh = [r for r in rows if (r.get("added_at") or "") >= newest]
+        new_rows.extend(fresh)
+        if len(fresh) < len(rows):
+            break
+
+    # Même seconde que `newest` : dédoublonnage par track_id (un titre ré-aimé remonte en tête)
+    new_ids = {r["track_id"] for r in new_rows}
+    with open(csv_path, "r", encoding="utf-8", newline="") as f_in:
+        added = len(new_ids - {row.get("track_id") for row in csv.DictReader(f_in)})
+
+    tmp_path = csv_path + ".tmp"
+    with open(csv_path, "r", encoding="utf-8", newline="") as f_in, \
+            open(tmp_path, "w", encoding="utf-8", newline="") as f_out:
+        w = csv.DictWriter(f_out, fieldnames=FIELDNAMES)
+        w.writeheader()
+        for row in new_rows:
+            w.writerow({k: row.get(k) for k in FIELDNAMES})
+        for row in csv.DictReader(f_in):
+            if row.get("track_id") not in new_ids:
+                w.writerow({k: row.get(k) for k in FIELDNAMES})
+    os.replace(tmp_path, csv_path)
+
+    _save_sync_state(csv_path, max([newest] + [r["added_at"] for r in new_rows if r.get("added_at")]))
+    return added
 
 
 # ------------------------ Playlist -> CSV par ID ------------------------
@@ -331,6 +707,8 @@ def write_playlist_csv_by_id(
     playlist_id: str,
     market: Optional[str] = None,
     limit: int = 50,
+    workers: int = PAGE_WORKERS,
+    resume: bool = True,
 ) -> str:
     if not playlist_id:
         raise ValueError("playlist_id est requis.")
@@ -345,57 +723,125 @@ def write_playlist_csv_by_id(
         safe = playlist_id
     out_path = os.path.join(BASE_DIR, f"{safe}.csv")
 
-    # (2) Itération paginée des items
-    rows: List[Dict[str, Any]] = []
-    offset = 0
-    limit = max(1, min(int(limit), 50))
-    while True:
-        params = {
-            "market": market,
-            "limit": limit,
-            "offset": offset,
-            "additional_types": "track",
-        }
-        page = api_request_with_reauth("GET", f"/playlists/{playlist_id}/tracks", token_cache, params=params)
-        items = page.get("items") or []
-        if not items:
-            break
+    # (2) Itération paginée des items (pages en parallèle si workers > 1), écrites au fil de l'eau.
+    # Le snapshot_id fait partie du checkpoint : si la playlist a changé, on repart de zéro.
+    params = {"market": market, "additional_types": "track"}
+    meta = {"snapshot_id": pl.get("snapshot_id")}
+    export_pages_csv(token_cache, f"/playlists/{playlist_id}/tracks", params, out_path, market, limit, workers, resume, meta)
+    return out_path
+
+
+# ------------------------ Plusieurs playlists -> un seul CSV dédoublonné ------------------------
+COMBINED_FIELDNAMES = FIELDNAMES + ["source_playlist"]
+
+
+def parse_playlist_id(value: str) -> str:
+    """Accepte un ID, une URI spotify:playlist:ID ou une URL open.spotify.com/playlist/ID."""
+    value = value.strip()
+    if value.startswith("spotify:playlist:"):
+        return value.split(":")[-1]
+    if "open.spotify.com" in value:
+        path = urllib.parse.urlparse(value).path.rstrip("/")
+        return path.split("/")[-1]
+    return value
+
 
-        for it in items:
-            tr = it.get("track") or {}
-            if not tr or tr.get("type") != "track":
+def read_playlist_ids(path: str) -> List[str]:
+    """Un ID (ou lien) par ligne ; lignes vides et commentaires (#) ignorés."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [parse_playlist_id(line) for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+def _produce_playlist_pages(token_cache: Dict[str, Any], playlist_id: str, market: Optional[str], limit: int,
+                            workers: int, pages: queue.Queue, stop: threading.Event) -> None:
+    """
+    Pousse les pages d'une playlist dans `pages` (file bornée), puis None en fin de playlist ;
+    une erreur est transmise telle quelle au consommateur. S'arrête dès que `stop` est levé.
+    """
+    def put(item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.5)
+                return True
+            except queue.Full:
                 continue
-            album = tr.get("album") or {}
-            artists = tr.get("artists") or []
-            artist_names = "; ".join([a.get("name", "") for a in artists if a])
-            artist_ids = "; ".join([a.get("id", "") for a in artists if a])
-
-            album_id = album.get("id")
-            # Vérifie/corrige total_tracks via /albums/{id}
-            album_total_tracks = get_album_total_tracks_exact(token_cache, album_id, market)
-            if album_total_tracks is None:
-                album_total_tracks = album.get("total_tracks")
-
-            rows.append({
-                # --- Colonnes exportées ---
-                "track_id": tr.get("id"),
-                "track_name": tr.get("name"),
-                "track_popularity": tr.get("popularity"),
-                "duration_ms": tr.get("duration_ms"),
-                "artist_names": artist_names,
-                "artist_ids": artist_ids,
-                "album_id": album_id,
-                "album_name": album.get("name"),
-                "album_release_date": album.get("release_date"),
-                "album_total_tracks": album_total_tracks,
-            })
-
-        offset += len(items)
-        if not page.get("next"):
-            break
+        return False
 
-    write_csv(rows, out_path)
-    return out_path
+    try:
+        for _, rows in iter_page_rows(token_cache, f"/playlists/{playlist_id}/tracks",
+                                      {"market": market, "additional_types": "track"}, market, limit, workers):
+            for row in rows:
+                row["source_playlist"] = playlist_id
+            if not put(rows):
+                return
+    except Exception as e:
+        put(e)
+        return
+    put(None)
+
+
+def export_playlists_combined(
+    token_cache: Dict[str, Any],
+    playlist_ids: List[str],
+    csv_path: str = CSV_COMBINED_PATH,
+    market: Optional[str] = None,
+    limit: int = 50,
+    workers: int = PLAYLIST_WORKERS,
+) -> int:
+    """
+    Récupère les playlists en parallèle (les albums sont résolus une seule fois grâce au
+    cache partagé) et écrit un CSV unique avec `source_playlist`, dédoublonné par track_id :
+    un titre présent dans plusieurs playlists garde la 1re playlist de la liste. Les lignes
+    sans track_id (fichiers locaux, titres indisponibles) ne sont pas dédoublonnées.
+    Les pages passent par CsvExportWriter au fil de l'eau, dans l'ordre des playlists : seules
+    PLAYLIST_QUEUE_PAGES pages par playlist en cours attendent en mémoire.
+    Renvoie le nombre de lignes écrites.
+    """
+    playlist_ids = list(dict.fromkeys(parse_playlist_id(p) for p in playlist_ids if p and p.strip()))
+    if not playlist_ids:
+        raise ValueError("Au moins un playlist_id est requis.")
+
+    # Budget de threads partagé : playlists en parallèle x pages en parallèle ~ PAGE_WORKERS
+    n_lists = max(1, min(workers, len(playlist_ids)))
+    page_workers = max(1, PAGE_WORKERS // n_lists)
+
+    seen: set = set()
+    stop = threading.Event()
+    queues = [queue.Queue(maxsize=PLAYLIST_QUEUE_PAGES) for _ in playlist_ids]
+    writer = CsvExportWriter(csv_path, meta={"playlists": playlist_ids}, resume=False, fieldnames=COMBINED_FIELDNAMES)
+    completed = False
+    try:
+        with ThreadPoolExecutor(max_workers=n_lists) as pool:
+            try:
+                for pid, pages in zip(playlist_ids, queues):
+                    pool.submit(_produce_playlist_pages, token_cache, pid, market, limit, page_workers, pages, stop)
+                # Écriture dans l'ordre des playlists demandées (sortie déterministe)
+                for pid, pages in zip(playlist_ids, queues):
+                    n_tracks = 0
+                    while True:
+                        rows = pages.get()
+                        if rows is None:
+                            break
+                        if isinstance(rows, Exception):
+                            raise rows
+                        n_tracks += len(rows)
+                        kept = []
+                        for row in rows:
+                            tid = row.get("track_id")
+                            # Fichiers locaux / titres indisponibles (id null) : gardés tels quels, comme à l'export simple
+                            if tid:
+                                if tid in seen:
+                                    continue
+                                seen.add(tid)
+                            kept.append(row)
+                        writer.write_page(writer.rows_written + len(kept), kept)
+                    print(f"Playlist {pid}: {n_tracks} titres")
+            finally:
+                stop.set()  # débloque les producteurs encore en attente si l'écriture s'arrête
+        completed = True
+    finally:
+        writer.close(completed)
+    return writer.rows_written
 
 
 # ------------------------ Token helper (créer/rafraîchir seulement si nécessaire) ------------------------
@@ -421,46 +867,101 @@ def ensure_user_token() -> Dict[str, Any]:
 
 
 # ------------------------ Main ------------------------
-def main():
-    if not (get_liked or get_playlist):
+def finish_output(csv_path: str, args: argparse.Namespace) -> str:
+    """Le CSV reste l'intermédiaire (écriture en flux, reprise) ; conversion typée si demandée."""
+    if args.format == "csv":
+        return csv_path
+    return export_columnar.csv_to_columnar(csv_path, args.format)
+
+
+def export_liked(tok: Dict[str, Any], args: argparse.Namespace) -> None:
+    if args.incremental:
+        added = sync_liked_tracks_csv(tok, CSV_LIKED_PATH, market=None, limit=50)
+        out_path = finish_output(CSV_LIKED_PATH, args)
+        print(f"Liked synchronisé: {out_path} ({added} nouveaux titres)")
+    else:
+        export_liked_tracks_csv(tok, CSV_LIKED_PATH, market=None, limit=50, resume=not args.no_resume)
+        _save_sync_state(CSV_LIKED_PATH, _newest_added_at(CSV_LIKED_PATH))
+        print(f"Liked écrit: {finish_output(CSV_LIKED_PATH, args)}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Export Spotify (Liked Songs / playlist) vers CSV.")
+    ap.add_argument("--no-album-cache", action="store_true",
+                    help="ignore le cache disque des albums (ni lecture ni écriture)")
+    ap.add_argument("--purge-album-cache", action="store_true",
+                    help="vide le cache disque des albums avant l'export")
+    ap.add_argument("--no-resume", action="store_true",
+                    help="ignore les checkpoints et réécrit les CSV depuis le début")
+    ap.add_argument("--incremental", action="store_true",
+                    help="Liked Songs : ne récupère que les titres ajoutés depuis le dernier export (added_at)")
+    ap.add_argument("--playlists", nargs="+", default=[], metavar="ID",
+                    help="IDs (ou liens) de playlists à exporter ensemble dans all_playlists_combined.csv "
+                         "(remplace la playlist codée en dur dans playlist_ID, qui n'est alors pas exportée)")
+    ap.add_argument("--playlists-file", metavar="FICHIER",
+                    help="fichier texte avec un ID de playlist par ligne (combiné avec --playlists)")
+    ap.add_argument("--format", choices=("csv",) + export_columnar.FORMATS, default="csv",
+                    help="format de sortie : csv (défaut), parquet ou feather (Arrow IPC, schéma typé, requiert pyarrow)")
+    return ap.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+
+    if args.purge_album_cache or not args.no_album_cache:
+        store = open_album_cache()
+        if args.purge_album_cache:
+            print(f"Cache albums purgé: {store.purge()} entrées supprimées")
+        if args.no_album_cache:
+            close_album_cache()
+
+    playlist_ids = list(args.playlists)
+    if args.playlists_file:
+        playlist_ids += read_playlist_ids(args.playlists_file)
+
+    if not (get_liked or get_playlist or playlist_ids):
         print("Rien à faire : get_liked=False et get_playlist=False.")
         return
 
     # Crée/rafraîchit le cache OAuth UNIQUEMENT si nécessaire
     tok = ensure_user_token()
 
-    # Playlist uniquement ?
-    if get_playlist and not get_liked:
-        if not playlist_ID.strip():
+    def export_playlists() -> None:
+        if playlist_ids:
+            if get_playlist and playlist_ID.strip() and parse_playlist_id(playlist_ID) not in map(parse_playlist_id, playlist_ids):
+                print(f"Attention: --playlists remplace playlist_ID ({playlist_ID.strip()}), qui n'est pas exportée", file=sys.stderr)
+            n = export_playlists_combined(tok, playlist_ids, CSV_COMBINED_PATH, market=None, limit=50)
+            out_path = finish_output(CSV_COMBINED_PATH, args)
+            print(f"Export combiné écrit: {out_path} ({n} titres uniques, {len(set(playlist_ids))} playlists)")
+        elif not playlist_ID.strip():
             print("Erreur: get_playlist=True mais playlist_ID est vide.", file=sys.stderr)
             sys.exit(1)
-        out_path = write_playlist_csv_by_id(tok, playlist_ID.strip(), market=None, limit=50)
-        print(f"CSV playlist écrit: {out_path}")
+        else:
+            out_path = write_playlist_csv_by_id(tok, playlist_ID.strip(), market=None, limit=50, resume=not args.no_resume)
+            print(f"Playlist écrite: {finish_output(out_path, args)}")
+
+    # Playlist(s) uniquement ?
+    if not get_liked:
+        export_playlists()
         return
 
     # Liked uniquement ?
-    if get_liked and not get_playlist:
-        rows = get_all_liked_tracks(tok, market=None, limit=50)
-        write_csv(rows, CSV_LIKED_PATH)
-        print(f"CSV liked écrit: {CSV_LIKED_PATH}")
+    if not (get_playlist or playlist_ids):
+        export_liked(tok, args)
         return
 
-    # Les deux
-    if get_liked and get_playlist:
-        rows = get_all_liked_tracks(tok, market=None, limit=50)
-        write_csv(rows, CSV_LIKED_PATH)
-        print(f"CSV liked écrit: {CSV_LIKED_PATH}")
-
-        if not playlist_ID.strip():
-            print("Avertissement: get_playlist=True mais playlist_ID est vide. Skip playlist.", file=sys.stderr)
-        else:
-            out_path = write_playlist_csv_by_id(tok, playlist_ID.strip(), market=None, limit=50)
-            print(f"CSV playlist écrit: {out_path}")
+    # Les deux : exports lancés en parallèle (le limiteur partagé régule le débit global)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        jobs = [pool.submit(export_liked, tok, args), pool.submit(export_playlists)]
+        for job in jobs:
+            job.result()
 
 
 if __name__ == "__main__":
     try:
         main()
+        print(f"Albums: {_album_stats['disk_hits']} lus depuis le cache disque, {_album_stats['fetched']} demandés à l'API")
+        spotify_http.print_stats()
     except requests.HTTPError as e:
         try:
             j = e.response.json()
@@ -1,9 +1,10 @@
-import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 
-# Load your dataset (adjust the path)
-data = pd.read_csv("data/processed/cleaned_final_dataset.csv")
+from dataset import load_dataset
+
+# Load the dataset (typed and cached, works from any working directory)
+data = load_dataset()
 
 # Function to detect outliers using IQR
 def detect_outliers(df, col):
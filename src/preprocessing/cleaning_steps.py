@@ -1,42 +1,178 @@
+"""
+Cleaning pipeline: raw enriched CSV -> data/processed/cleaned_final_dataset.csv
+
+The input is read once, with explicit dtypes, and the declared STEPS run in
+order on that single frame:
+
+    normalize_text   strip, collapse whitespace and lowercase the text columns
+    fill_missing     'unknown' for text, 0 for numbers
+    cast_types       numeric columns to int64
+    flag_groups      gender = 'group' for multi-artist tracks and MusicBrainz groups
+    dedupe           drop repeated (track_id, track_name, artist_names)
+
+With a chunksize, the CSV is streamed and cleaned chunk by chunk (dedupe
+remembers the keys it has already seen), so inputs larger than RAM work.
+Each step logs its time and the change in the frame's memory.
+
+Usage:
+    python src/preprocessing/cleaning_steps.py
+    python src/preprocessing/cleaning_steps.py --input big.csv --output out.csv --chunksize 200000
+    python src/preprocessing/cleaning_steps.py --validate     # then run validation.py on the output
+
+or from Python:
+    from cleaning_steps import clean_frame, clean_csv
+"""
+
+import argparse
+import sys
+import time
+
 import pandas as pd
 
-df = pd.read_csv("data/raw/cleaned_top_songs-with_genres-genders.csv")
-# Remove spaces and convert to lowercase
-df['artist'] = df['artist_names'].str.strip().str.title()
-df['track_name'] = df['track_name'].str.strip().str.lower()
-
-# ==========================
-# Check duplicates based on specific columns
-# Example: track_id, track_name, artist_names
-# ==========================
-key_columns = ["track_id", "track_name", "artist_names"]
-key_duplicates = df[df.duplicated(subset=key_columns, keep=False)]
-print(f"\nNumber of duplicate tracks (based on {key_columns}): {len(key_duplicates)}")
-if len(key_duplicates) > 0:
-    print(key_duplicates)
+INPUT_CSV = "data/raw/cleaned_top_songs-with_genres-genders.csv"
+OUTPUT_CSV = "data/processed/cleaned_final_dataset.csv"
 
-def clean_missing_values(df):
-    # Text
-    text_cols = ['artist_names', 'track_name', 'album_name', 'genre', 'album_release_date', 'gender']
-    for col in text_cols:
-        df[col] = df[col].fillna('unknown').str.lower()
-
-    # Numeric
-    numeric_cols = ['track_popularity', 'duration_ms', 'album_total_tracks', 'release_year']
-    for col in numeric_cols:
-        if col in df.columns:
-            df[col] = df[col].fillna(0)
-            df[col] = df[col].astype('int64')  # or: df[col] = df[col].apply(np.int64)
-
-    # Mark groups in gender
-    df.loc[df['artist_names'].str.contains(';'), 'gender'] = 'group'
+TEXT_COLUMNS = ['artist_names', 'track_name', 'album_name', 'genre', 'album_release_date', 'gender']
+NUMERIC_COLUMNS = ['track_popularity', 'duration_ms', 'album_total_tracks', 'release_year']
+KEY_COLUMNS = ["track_id", "track_name", "artist_names"]
+
+# MusicBrainz artist types that are not a single person (see enriched_with_gender.py)
+GROUP_TYPES = {'group', 'orchestra', 'choir'}
+
+# Explicit read dtypes: text stays text, numbers are read as float so that
+# missing values survive until fill_missing / cast_types
+READ_DTYPES = {
+    'track_id': 'str', 'track_name': 'str', 'artist_names': 'str', 'artist_ids': 'str',
+    'album_id': 'str', 'album_name': 'str', 'album_release_date': 'str',
+    'genre': 'str', 'gender': 'str', 'artist_type': 'str',
+    'track_popularity': 'float64', 'duration_ms': 'float64',
+    'album_total_tracks': 'float64', 'release_year': 'float64',
+}
+
+# ============================================================
+# Steps: each takes the frame (and the run state) and returns it
+# ============================================================
+
+def _present(df, columns):
+    return [c for c in columns if c in df.columns]
+
+def normalize_text(df, state=None):
+    for col in _present(df, TEXT_COLUMNS):
+        df[col] = df[col].str.replace(r"\s+", " ", regex=True).str.strip().str.lower()
+    return df
+
+def fill_missing(df, state=None):
+    df.fillna({col: 'unknown' for col in _present(df, TEXT_COLUMNS)}
+              | {col: 0 for col in _present(df, NUMERIC_COLUMNS)}, inplace=True)
     return df
 
-df = pd.read_csv("data/raw/cleaned_top_songs-with_genres-genders.csv")
-df = clean_missing_values(df)
+def cast_types(df, state=None):
+    return df.astype({col: 'int64' for col in _present(df, NUMERIC_COLUMNS)})
+
+def flag_groups(df, state=None):
+    is_group = df['artist_names'].str.contains(';', regex=False, na=False)
+    if 'artist_type' in df.columns:
+        is_group |= df['artist_type'].str.lower().isin(GROUP_TYPES)
+    df.loc[is_group, 'gender'] = 'group'
+    return df
+
+def dedupe(df, state=None):
+    """Keeps the first occurrence; `state['seen']` carries the keys across chunks."""
+    keys = _present(df, KEY_COLUMNS)
+    hashes = pd.util.hash_pandas_object(df[keys], index=False)
+    repeated = hashes.duplicated()
+    if state is not None:
+        seen = state.setdefault('seen', set())
+        repeated |= hashes.isin(seen)
+        seen.update(hashes[~repeated])
+    if repeated.any():
+        print(f"Dropped {int(repeated.sum())} duplicate tracks (based on {keys})")
+        df = df[~repeated.to_numpy()]
+    return df
+
+STEPS = [
+    ("normalize_text", normalize_text),
+    ("fill_missing", fill_missing),
+    ("cast_types", cast_types),
+    ("flag_groups", flag_groups),
+    ("dedupe", dedupe),
+]
+
+# ============================================================
+# Running the pipeline
+# ============================================================
+
+def _memory_mb(df):
+    return df.memory_usage(deep=True).sum() / 2**20
+
+def clean_frame(df, steps=STEPS, state=None, timings=None):
+    """
+    Run `steps` on an already loaded frame. Per-step seconds and memory
+    deltas (MB) are added to `timings` when given, otherwise printed.
+    """
+    for name, step in steps:
+        t0, mem0 = time.perf_counter(), _memory_mb(df)
+        df = step(df, state)
+        elapsed, delta = time.perf_counter() - t0, _memory_mb(df) - mem0
+        if timings is None:
+            print(f"  {name:<15} {elapsed * 1000:8.1f} ms  {delta:+8.2f} MB")
+        else:
+            total = timings.setdefault(name, [0.0, 0.0])
+            total[0] += elapsed
+            total[1] += delta
+    return df
+
+def read_raw(path, chunksize=None):
+    """The raw CSV with READ_DTYPES; an iterator of chunks when chunksize is given."""
+    columns = pd.read_csv(path, nrows=0).columns
+    dtype = {col: t for col, t in READ_DTYPES.items() if col in columns}
+    return pd.read_csv(path, dtype=dtype, chunksize=chunksize)
+
+def clean_csv(input_csv_path=INPUT_CSV, output_csv_path=OUTPUT_CSV, chunksize=None, steps=STEPS):
+    """Clean a CSV in a single read (streamed when chunksize is set); returns the row count."""
+    state = {}
+    rows = 0
+    if chunksize is None:
+        print(f"Cleaning {input_csv_path}")
+        df = clean_frame(read_raw(input_csv_path), steps, state)
+        df.to_csv(output_csv_path, index=False)
+        rows = len(df)
+    else:
+        timings = {}
+        with open(output_csv_path, "w", encoding="utf-8", newline="") as f:
+            for i, chunk in enumerate(read_raw(input_csv_path, chunksize)):
+                chunk = clean_frame(chunk, steps, state, timings)
+                chunk.to_csv(f, index=False, header=(i == 0))
+                rows += len(chunk)
+        print(f"Cleaned {input_csv_path} in chunks of {chunksize}")
+        for name, (elapsed, delta) in timings.items():
+            print(f"  {name:<15} {elapsed * 1000:8.1f} ms  {delta:+8.2f} MB")
+    print(f"Saved {rows} rows to {output_csv_path}")
+    return rows
+
+def clean_missing_values(df):
+    """Fill, lowercase, cast and flag groups (the pipeline without dedupe)."""
+    return clean_frame(df, STEPS[:4], timings={})
+
+# ============================================================
+# CLI
+# ============================================================
 
-print(df.head())  # shows the first 5 rows
-print(df.info())  # shows column types and missing counts
-print(df.isnull().sum())
-print(df['release_year'].unique())  # Make sure year column looks correct
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Clean the enriched top-songs CSV.")
+    ap.add_argument("--input", default=INPUT_CSV)
+    ap.add_argument("--output", default=OUTPUT_CSV)
+    ap.add_argument("--chunksize", type=int, default=None, metavar="N",
+                    help="stream the input N rows at a time (for files larger than RAM)")
+    ap.add_argument("--validate", action="store_true",
+                    help="check the output with validation.py; exit code 1 on errors")
+    args = ap.parse_args(argv)
+    clean_csv(args.input, args.output, args.chunksize)
+    if args.validate:
+        from validation import print_summary, validate_csv
+        report = validate_csv(args.output, args.chunksize)
+        print_summary(report)
+        return 0 if report["ok"] else 1
 
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,37 +1,167 @@
+import argparse
+import os
+import sys
 import time
+import unicodedata
 import requests
 import pandas as pd
 from urllib.parse import quote_plus
 
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+from lookup_journal import LookupJournal  # noqa: E402
+from disk_cache import DiskCache  # noqa: E402
+
 # ============================================================
 # MusicBrainz Query
 # ============================================================
 
+# Overridable so benchmarks can target the local stand-in server
+MUSICBRAINZ_API_BASE = os.getenv("MUSICBRAINZ_API_BASE", "https://musicbrainz.org/ws/2")
+# MusicBrainz policy: at most ~1 request per second
+MUSICBRAINZ_DELAY = float(os.getenv("MUSICBRAINZ_DELAY", "1"))
+# Artists OR-combined into one search; the search returns at most 100 results
+SEARCH_BATCH_SIZE = int(os.getenv("MUSICBRAINZ_BATCH_SIZE", "25"))
+SEARCH_LIMIT = 100
+
+# Persistent lookup cache, keyed by normalized artist name.
+# "No artist found" entries expire sooner: MusicBrainz keeps growing.
+MUSICBRAINZ_CACHE_PATH = os.getenv(
+    "MUSICBRAINZ_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "musicbrainz_cache.sqlite"))
+CACHE_TTL_DAYS = float(os.getenv("MUSICBRAINZ_CACHE_TTL_DAYS", "90"))
+CACHE_NEGATIVE_TTL_DAYS = float(os.getenv("MUSICBRAINZ_CACHE_NEG_TTL_DAYS", "7"))
+CACHE_MAX_ENTRIES = int(os.getenv("MUSICBRAINZ_CACHE_MAX_ENTRIES", "500000"))
+
+# Transient failures are queued and retried at the end of the run
+TRANSIENT_STATUSES = (429, 500, 502, 503, 504)
+RETRY_ROUNDS = int(os.getenv("MUSICBRAINZ_RETRY_ROUNDS", "5"))
+RETRY_BASE = float(os.getenv("MUSICBRAINZ_RETRY_BASE", "2"))   # seconds, doubled every round
+RETRY_CAP = 60.0
+
+class TransientLookupError(Exception):
+    """Timeout, connection error, 429 or 5xx: worth retrying later."""
+
+    def __init__(self, reason, retry_after=None):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+def _retry_after(r):
+    try:
+        return float(r.headers.get("Retry-After", ""))
+    except ValueError:
+        return None
+
 def query_musicbrainz(url: str):
+    """
+    JSON body of a 200 response, None for any other definitive answer
+    (e.g. 400 on a malformed query). Raises TransientLookupError when the
+    request should be retried.
+    """
     try:
         r = requests.get(
             url,
             headers={"User-Agent": "LocalDatasetExtractor/1.0"},
             timeout=8
         )
-        if r.status_code == 200:
+    except requests.RequestException as e:
+        # Timeouts, refused/reset connections, bodies cut off while being read
+        # (ChunkedEncodingError, ContentDecodingError): all worth a retry
+        raise TransientLookupError(type(e).__name__) from e
+    if r.status_code in TRANSIENT_STATUSES:
+        raise TransientLookupError(f"HTTP {r.status_code}", _retry_after(r))
+    if r.status_code == 200:
+        try:
             return r.json()
+        except ValueError as e:  # truncated body
+            raise TransientLookupError("invalid JSON") from e
+    return None
+
+def search_artist(artist_name: str):
+    """Raw search response for one artist (see query_musicbrainz for failures)."""
+    encoded = quote_plus(lucene_phrase(artist_name))
+    url = f"{MUSICBRAINZ_API_BASE}/artist/?query={encoded}&fmt=json&limit=1"
+    return query_musicbrainz(url)
+
+def lucene_phrase(artist_name: str) -> str:
+    """artist:"..." clause with Lucene's phrase escapes (backslash and double quote)."""
+    escaped = artist_name.replace("\\", "\\\\").replace('"', '\\"')
+    return f'artist:"{escaped}"'
+
+def search_artists_batch(artist_names):
+    """One search for several artists (clauses joined with OR); failures as in query_musicbrainz."""
+    encoded = quote_plus(" OR ".join(lucene_phrase(n) for n in artist_names))
+    url = f"{MUSICBRAINZ_API_BASE}/artist/?query={encoded}&fmt=json&limit={SEARCH_LIMIT}"
+    return query_musicbrainz(url)
+
+def match_batch(keys, data):
+    """
+    Attribute the results of a batched search to the requested keys.
+
+    A result belongs to a key when its normalized name (or, failing that, one
+    of its aliases) equals the key; among those the best score wins. Keys with
+    no exact match, or whose exact matches disagree on any RECORD_COLUMNS
+    field (two artists with one name, even of the same gender), are returned
+    as ambiguous so the caller can fall back to a single-artist search.
+    """
+    by_name, by_alias = {}, {}
+    for artist in data.get("artists") or []:
+        by_name.setdefault(normalize_artist_name(artist.get("name")), []).append(artist)
+        for alias in artist.get("aliases") or []:
+            by_alias.setdefault(normalize_artist_name((alias or {}).get("name")), []).append(artist)
+
+    matched, ambiguous = {}, []
+    for key in keys:
+        candidates = by_name.get(key) or by_alias.get(key)
+        if not candidates or len({tuple(artist_record(c).values()) for c in candidates}) > 1:
+            ambiguous.append(key)
+            continue
+        matched[key] = max(candidates, key=lambda c: c.get("score") or 0)
+    return matched, ambiguous
+
+def artist_from_response(data):
+    """Top search result, or None when no artist was found."""
+    if not data or "artists" not in data or len(data["artists"]) == 0:
         return None
-    except:
-        return None
+    return data["artists"][0]
 
-def get_artist_gender(artist_name: str):
-    if not artist_name:
+# Fields kept from each artist found, and the CSV column each one is written to
+RECORD_COLUMNS = {
+    "gender": "gender",
+    "type": "artist_type",        # Person / Group / Orchestra / Choir / ...
+    "country": "artist_country",  # ISO 3166-1 code
+    "area": "artist_area",
+    "begin": "artist_begin",      # life-span: birth / formation date
+    "end": "artist_end",          # life-span: death / dissolution date
+}
+
+def artist_record(artist):
+    """The RECORD_COLUMNS fields of a search result, or None when no artist was found."""
+    if artist is None:
         return None
+    life_span = artist.get("life-span") or {}
+    return {
+        "gender": artist.get("gender"),
+        "type": artist.get("type"),
+        "country": artist.get("country"),
+        "area": (artist.get("area") or {}).get("name"),
+        "begin": life_span.get("begin"),
+        "end": life_span.get("end"),
+    }
 
-    encoded = quote_plus(f'artist:"{artist_name}"')
-    url = f"https://musicbrainz.org/ws/2/artist/?query={encoded}&fmt=json&limit=1"
+def gender_from_response(data):
+    return (artist_from_response(data) or {}).get("gender")
 
-    data = query_musicbrainz(url)
-    if not data or "artists" not in data or len(data["artists"]) == 0:
+def get_artist_record(artist_name: str):
+    if not artist_name:
+        return None
+    try:
+        return artist_record(artist_from_response(search_artist(artist_name)))
+    except TransientLookupError:
         return None
 
-    return data["artists"][0].get("gender")
+def get_artist_gender(artist_name: str):
+    return (get_artist_record(artist_name) or {}).get("gender")
 
 # ============================================================
 # Guaranteed Working Parser
@@ -50,27 +180,242 @@ def parse_artist_field(raw):
 # Main Processing
 # ============================================================
 
-def enrich_dataset(input_csv_path: str, output_csv_path: str):
+def normalize_artist_name(name):
+    """Lookup key for an artist name: NFKC, casefolded, inner whitespace collapsed."""
+    if not isinstance(name, str):
+        return None
+    key = " ".join(unicodedata.normalize("NFKC", name).casefold().split())
+    return key or None
+
+def _first(raw):
+    return (parse_artist_field(raw) or [None])[0]
+
+def first_artist_keys(artist_names: pd.Series, artist_ids: pd.Series = None) -> pd.DataFrame:
+    """
+    Per row: the first listed artist, its normalized key and, when the CSV
+    has an artist_ids column, its Spotify ID.
+    Parsing runs once per distinct raw value, not once per row.
+    """
+    rows = artist_names.to_frame("artist_names")
+    raw = artist_names.drop_duplicates()
+    table = pd.DataFrame({"artist_names": raw.to_numpy(), "first_artist": raw.map(_first).to_numpy()})
+    table["artist_key"] = table["first_artist"].map(normalize_artist_name)
+    keys = rows.merge(table, on="artist_names", how="left")
+    if artist_ids is not None:
+        ids = artist_ids.drop_duplicates()
+        id_table = pd.DataFrame({"artist_ids": ids.to_numpy(), "first_artist_id": ids.map(_first).to_numpy()})
+        keys["first_artist_id"] = artist_ids.to_frame("artist_ids").merge(id_table, on="artist_ids", how="left")["first_artist_id"].to_numpy()
+    return keys
+
+def journal_path(output_csv_path: str) -> str:
+    return output_csv_path + ".journal.jsonl"
+
+def open_cache(path: str = MUSICBRAINZ_CACHE_PATH) -> DiskCache:
+    day = 24 * 3600
+    return DiskCache(path, table="artists", ttl=CACHE_TTL_DAYS * day,
+                     negative_ttl=CACHE_NEGATIVE_TTL_DAYS * day, max_entries=CACHE_MAX_ENTRIES)
+
+def is_record(value):
+    """True for a full artist_record() or a "not found" None (older entries only held the gender)."""
+    return value is None or (isinstance(value, dict) and RECORD_COLUMNS.keys() <= value.keys())
+
+def resolve_artists(names: dict, journal: LookupJournal, resolved: dict, cache: DiskCache = None) -> dict:
+    """
+    Resolve every key in `names` ({key: display name}) that is not already in
+    `resolved`; returns {key: artist_record() or None}.
+
+    Keys found in the persistent cache are not queried. The others are
+    searched SEARCH_BATCH_SIZE at a time with OR-combined queries; only the
+    ambiguous ones get a single-artist search afterwards. A single search
+    rejected with a definitive error is stored as not found, like an empty
+    result, so it is not queried again; it is reported as "rejected".
+    """
+    todo = [k for k in names if k not in resolved]
+    if cache is not None and todo:
+        hits = {k: v for k, v in cache.get_many(todo).items() if is_record(v)}
+        resolved.update(hits)
+        todo = [k for k in todo if k not in hits]
+        print(f"{len(hits)} artists from the cache")
+    print(f"{len(names)} distinct artists, {len(todo)} to query")
+
+    stats = {"found": 0, "not_found": 0, "rejected": 0, "failed": 0, "requests": 0, "single": 0, "retried": 0}
+
+    def store(key, artist, outcome=None):
+        resolved[key] = artist_record(artist)
+        stats[outcome or ("found" if artist is not None else "not_found")] += 1
+        journal.record("artist", key, resolved[key])
+        if cache is not None:
+            cache.put(key, resolved[key])
+
+    retry_queue = []   # (kind, keys) jobs that hit a transient failure
+    last_error = [None]
+
+    def run(kind, keys):
+        """One request; returns the keys that still need a single-artist search."""
+        stats["requests"] += 1
+        try:
+            if kind == "batch":
+                data = search_artists_batch([names[k] for k in keys])
+            else:
+                data = search_artist(names[keys[0]])
+        except TransientLookupError as e:
+            retry_queue.append((kind, keys))
+            last_error[0] = e
+            return []
+        finally:
+            time.sleep(MUSICBRAINZ_DELAY)
+        if data is None:
+            if kind == "batch":
+                return keys
+            # Definitive error on a single search (e.g. 400): the same query would be
+            # rejected again, so it is stored like "not found" but counted apart
+            store(keys[0], None, "rejected")
+            return []
+        if kind == "single":
+            store(keys[0], artist_from_response(data))
+            return []
+        matched, ambiguous = match_batch(keys, data)
+        for key, artist in matched.items():
+            store(key, artist)
+        return ambiguous
+
+    def run_all(jobs):
+        single = []
+        for n, (kind, keys) in enumerate(jobs, 1):
+            single.extend(run(kind, keys))
+            if kind == "batch" and n % 20 == 0:
+                print(f"  {n}/{len(jobs)} batches searched")
+        stats["single"] += len(single)
+        for key in single:
+            run("single", [key])
 
+    run_all([("batch", todo[i:i + SEARCH_BATCH_SIZE]) for i in range(0, len(todo), SEARCH_BATCH_SIZE)])
+
+    for attempt in range(RETRY_ROUNDS):
+        if not retry_queue:
+            break
+        jobs, retry_queue[:] = list(retry_queue), []
+        wait = min(RETRY_CAP, RETRY_BASE * 2 ** attempt)
+        if last_error[0] is not None and last_error[0].retry_after:
+            wait = max(wait, last_error[0].retry_after)
+        n_keys = sum(len(keys) for _, keys in jobs)
+        print(f"Retry round {attempt + 1}/{RETRY_ROUNDS}: {n_keys} artists after {wait:.0f}s ({last_error[0]})")
+        time.sleep(wait)
+        stats["retried"] += n_keys
+        last_error[0] = None
+        run_all(jobs)
+
+    stats["failed"] += sum(len(keys) for _, keys in retry_queue)
+    print(f"{stats['requests']} requests ({stats['single']} single-artist fallbacks, {stats['retried']} artist retries): "
+          f"{stats['found']} found, {stats['not_found']} not found, "
+          f"{stats['rejected']} rejected by MusicBrainz (stored as not found), {stats['failed']} failed")
+    if stats["failed"]:
+        print("Failed lookups were not cached or journaled: rerun with --resume to retry them")
+    return {k: resolved.get(k) for k in names}
+
+def resolve_offline(keys: pd.DataFrame, names: dict, index_path: str) -> dict:
+    """
+    Resolve from the local MusicBrainz index (see musicbrainz_index.py).
+    The Spotify ID of the first artist is tried first and the normalized name
+    second. Returns {key: artist_record()} for the keys that were found.
+    """
+    from musicbrainz_index import MusicBrainzIndex  # optional: only needed offline
+
+    index = MusicBrainzIndex(index_path)
+    try:
+        found = {}
+        if "first_artist_id" in keys:
+            pairs = keys.dropna(subset=["artist_key", "first_artist_id"]).drop_duplicates("artist_key")
+            by_id = index.by_spotify(pairs["first_artist_id"])
+            for key, sid in zip(pairs["artist_key"], pairs["first_artist_id"]):
+                if sid in by_id:
+                    found[key] = by_id[sid]
+        found.update(index.by_name(k for k in names if k not in found))
+    finally:
+        index.close()
+    print(f"Offline index: {len(found)}/{len(names)} artists resolved")
+    return found
+
+def enrich_dataset(input_csv_path: str, output_csv_path: str, resume: bool = False,
+                   offline_index: str = None, http_fallback: bool = False,
+                   cache_path: str = MUSICBRAINZ_CACHE_PATH):
+    """
+    Each distinct first artist (compared by normalize_artist_name) is looked
+    up once, and the result is merged back onto every row, so run time grows
+    with the number of artists, not tracks. Besides gender, the rest of the
+    artist record is written too (RECORD_COLUMNS: type, country, area,
+    life-span begin / end).
+
+    With offline_index, artists are resolved from the local MusicBrainz
+    index; the web service is then only queried for misses, and only when
+    http_fallback is set.
+
+    Web lookups go through a persistent cache at cache_path (None disables
+    it), so a rerun only queries artists that are new since the last run.
+
+    Every finished lookup is appended to <output>.journal.jsonl as soon as it
+    completes. With resume=True, artists already in the journal are not
+    queried again, so a crashed run picks up where it stopped.
+    Failed requests are not journaled and get retried on the next resume.
+    """
     df = pd.read_csv(input_csv_path)
 
-    genders = []
+    keys = first_artist_keys(df["artist_names"], df["artist_ids"] if "artist_ids" in df else None)
+    distinct = keys.dropna(subset=["artist_key"]).drop_duplicates("artist_key")
+    names = dict(zip(distinct["artist_key"], distinct["first_artist"]))
 
-    for raw in df["artist_names"]:
-        artists = parse_artist_field(raw)
-        first_artist = artists[0] if artists else None
-        gender = get_artist_gender(first_artist)
-        genders.append(gender)
-        time.sleep(1)
-    df["gender"] = genders
+    records = {}
+    if offline_index:
+        records = resolve_offline(keys, names, offline_index)
+        names = {k: v for k, v in names.items() if k not in records} if http_fallback else {}
+
+    if names:
+        journal = LookupJournal(journal_path(output_csv_path), resume=resume)
+        resolved = {k: v for k, v in journal.loaded.get("artist", {}).items() if is_record(v)}
+        if resume:
+            print(f"Resuming: {len(resolved)} artists already resolved")
+        cache = open_cache(cache_path) if cache_path else None
+        try:
+            records.update(resolve_artists(names, journal, resolved, cache))
+        finally:
+            journal.close()
+            if cache is not None:
+                cache.close()
+
+    lookup = pd.DataFrame(
+        [[key] + [(rec or {}).get(field) for field in RECORD_COLUMNS] for key, rec in records.items()],
+        columns=["artist_key"] + list(RECORD_COLUMNS.values()), dtype=object)
+    merged = keys[["artist_key"]].merge(lookup, on="artist_key", how="left", validate="many_to_one")
+    for column in RECORD_COLUMNS.values():
+        df[column] = merged[column].to_numpy()
     df.to_csv(output_csv_path, index=False)
     print("Saved:", output_csv_path)
 
-def main():
-    enrich_dataset(
-        "cleaned_top_songs-with_genres.csv",
-        "cleaned_top_songs-with_genres-genders.csv"
-    )
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Add MusicBrainz gender / artist type / country / area / life-span columns to a tracks CSV.")
+    ap.add_argument("--input", default="cleaned_top_songs-with_genres.csv")
+    ap.add_argument("--output", default="cleaned_top_songs-with_genres-genders.csv")
+    ap.add_argument("--resume", action="store_true",
+                    help="reload <output>.journal.jsonl from an interrupted run and only query the rest")
+    ap.add_argument("--offline-index", metavar="PATH",
+                    help="resolve from a local index built by musicbrainz_index.py instead of the web service")
+    ap.add_argument("--http-fallback", action="store_true",
+                    help="with --offline-index, query the web service for artists missing from the index")
+    ap.add_argument("--cache", default=MUSICBRAINZ_CACHE_PATH, metavar="PATH",
+                    help="persistent lookup cache (SQLite)")
+    ap.add_argument("--no-cache", action="store_true", help="query every artist, ignoring the cache")
+    ap.add_argument("--purge-cache", action="store_true", help="empty the cache before running")
+    return ap.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.purge_cache:
+        cache = open_cache(args.cache)
+        print(f"Cache purged: {cache.purge()} entries")
+        cache.close()
+    enrich_dataset(args.input, args.output, resume=args.resume,
+                   offline_index=args.offline_index, http_fallback=args.http_fallback,
+                   cache_path=None if args.no_cache else args.cache)
 
 if __name__ == "__main__":
     main()
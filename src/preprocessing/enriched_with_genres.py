@@ -13,11 +13,20 @@ import threading
 import time
 import urllib.parse
 import webbrowser
-import csv
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
 
 import requests  # pip install requests
 
+# Modules partagés dans src/ (session HTTP poolée)
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+import spotify_http  # noqa: E402
+from lookup_journal import LookupJournal  # noqa: E402
+
 # ===================== CONFIG =====================
 spotify_ID = "c62c55975a5f467a89a13bcb6fdcb76e"  # Mets ton CLIENT_ID ici si tu n'utilises pas la variable d'env
 INPUT_CSV = "all_playlists_combined.csv"                    # CSV source à enrichir
@@ -35,7 +44,7 @@ SEP_OUT = "; "    # séparateur pour la liste finale des genres
 # ===================== Spotify OAuth / API =====================
 SPOTIFY_AUTH_URL = "https://accounts.spotify.com/authorize"
 SPOTIFY_TOKEN_URL = "https://accounts.spotify.com/api/token"
-SPOTIFY_API_BASE = "https://api.spotify.com/v1"
+SPOTIFY_API_BASE = os.getenv("SPOTIFY_API_BASE", "https://api.spotify.com/v1")  # surchargeable (stand-in local des benchmarks)
 
 CLIENT_ID = os.getenv("SPOTIFY_CLIENT_ID", spotify_ID)
 REDIRECT_URI = os.getenv("SPOTIFY_REDIRECT_URI", "http://127.0.0.1:8721/callback")
@@ -49,10 +58,40 @@ CALLBACK_PATH = urllib.parse.urlparse(REDIRECT_URI).path or "/callback"
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 TOKEN_CACHE_PATH = os.path.join(BASE_DIR, "spotify_token_cache.json")
 
+# Nb de requêtes /albums et /artists envoyées en parallèle (le limiteur partagé régule le débit)
+ENRICH_WORKERS = int(os.getenv("SPOTIFY_ENRICH_WORKERS", "8"))
+ALBUMS_BATCH_SIZE = 20    # API: /albums?ids= accepte au plus 20 IDs
+ARTISTS_BATCH_SIZE = 50   # API: /artists?ids= accepte au plus 50 IDs
+CHUNK_ROWS = 100_000      # taille de bloc suggérée pour --chunksize
+
 # ===================== Caches =====================
 _artist_genres_cache: Dict[str, List[str]] = {}   # artist_id -> [genres]
 _album_artists_cache: Dict[str, List[str]] = {}   # album_id  -> [artist_ids]
 
+# Journal des lookups terminés (reprise après crash avec --resume) ; None => désactivé
+_journal: Optional[LookupJournal] = None
+
+
+def _remember(kind: str, items: Dict[str, List[str]]) -> None:
+    if _journal is not None:
+        _journal.record_many(kind, items.items())
+
+
+def open_journal(path: str, resume: bool = False) -> LookupJournal:
+    """Ouvre le journal ; avec resume=True, recharge les caches depuis les lookups déjà faits."""
+    global _journal
+    _journal = LookupJournal(path, resume=resume)
+    _album_artists_cache.update(_journal.loaded.get("album", {}))
+    _artist_genres_cache.update(_journal.loaded.get("artist", {}))
+    return _journal
+
+
+def close_journal() -> None:
+    global _journal
+    if _journal is not None:
+        _journal.close()
+        _journal = None
+
 # ===================== PKCE & OAuth =====================
 def _b64url_no_pad(data: bytes) -> str:
     return base64.urlsafe_b64encode(data).decode("utf-8").rstrip("=")
@@ -181,6 +220,8 @@ def get_user_token_via_pkce(client_id: str, redirect_uri: str, scope: str, timeo
     return tokens
 
 # ===================== API helpers =====================
+_token_lock = threading.Lock()  # un seul refresh à la fois quand les lots /albums et /artists partent en parallèle
+
 def auth_header(access_token: str) -> Dict[str, str]:
     return {"Authorization": f"Bearer {access_token}", "Accept": "application/json"}
 
@@ -189,24 +230,23 @@ def api_request(method: str, path: str, access_token: str,
                 json_body: Optional[Dict[str, Any]] = None,
                 timeout: int = 15) -> requests.Response:
     url = f"{SPOTIFY_API_BASE}{path if path.startswith('/') else '/' + path}"
-    r = requests.request(method.upper(), url, headers=auth_header(access_token),
-                         params=params, json=json_body, timeout=timeout)
+    r = spotify_http.request(method, url, headers=auth_header(access_token),
+                             params=params, json=json_body, timeout=timeout)
     return r
 
 def api_request_with_reauth(method: str, path: str, token_cache: Dict[str, Any],
                             params: Optional[Dict[str, Any]] = None,
                             json_body: Optional[Dict[str, Any]] = None,
                             timeout: int = 15) -> Dict[str, Any]:
-    r = api_request(method, path, token_cache["access_token"], params, json_body, timeout)
+    used_token = token_cache["access_token"]
+    r = api_request(method, path, used_token, params, json_body, timeout)
     if r.status_code == 401 and "refresh_token" in token_cache:
-        new_tok = refresh_access_token(token_cache["refresh_token"], CLIENT_ID)
-        token_cache.update(new_tok)
-        save_token_cache(token_cache)
-        r = api_request(method, path, token_cache["access_token"], params, json_body, timeout)
-
-    if r.status_code == 429:
-        retry_after = int(r.headers.get("Retry-After", "1"))
-        time.sleep(max(retry_after, 1))
+        # Rafraîchit (sauf si un autre thread vient de le faire) et retente 1 fois
+        with _token_lock:
+            if token_cache["access_token"] == used_token:
+                new_tok = refresh_access_token(token_cache["refresh_token"], CLIENT_ID)
+                token_cache.update(new_tok)
+                save_token_cache(token_cache)
         r = api_request(method, path, token_cache["access_token"], params, json_body, timeout)
 
     r.raise_for_status()
@@ -234,33 +274,62 @@ def get_album_artist_ids(token_cache: Dict[str, Any], album_id: Optional[str]) -
     album = api_request_with_reauth("GET", f"/albums/{album_id}", token_cache)
     ids = [a.get("id") for a in (album.get("artists") or []) if a and a.get("id")]
     _album_artists_cache[album_id] = _unique(ids)
+    _remember("album", {album_id: _album_artists_cache[album_id]})
     return _album_artists_cache[album_id]
 
-def get_genres_for_artist_ids(token_cache: Dict[str, Any], artist_ids: List[str]) -> List[str]:
-    """Union des genres de tous les artistes (batch /artists + fallback /artists/{id}), avec cache."""
+def prefetch_album_artists(token_cache: Dict[str, Any], album_ids: List[str], workers: int = ENRICH_WORKERS) -> None:
+    """Remplit _album_artists_cache pour tous les albums inconnus : lots /albums?ids= (20) en parallèle."""
+    missing = [a for a in _unique(album_ids) if a not in _album_artists_cache]
+    if not missing:
+        return
+
+    def fetch(chunk: List[str]) -> None:
+        data = api_request_with_reauth("GET", "/albums", token_cache, params={"ids": ",".join(chunk)})
+        # Albums renvoyés dans l'ordre des IDs, null pour un ID inconnu
+        resolved: Dict[str, List[str]] = {aid: [] for aid in chunk}
+        for aid, album in zip(chunk, data.get("albums") or []):
+            ids = [a.get("id") for a in ((album or {}).get("artists") or []) if a and a.get("id")]
+            resolved[aid] = _unique(ids)
+        _album_artists_cache.update(resolved)
+        _remember("album", resolved)
+
+    chunks = [missing[i:i + ALBUMS_BATCH_SIZE] for i in range(0, len(missing), ALBUMS_BATCH_SIZE)]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        list(pool.map(fetch, chunks))
+
+
+def get_genres_for_artist_ids(token_cache: Dict[str, Any], artist_ids: List[str], workers: int = ENRICH_WORKERS) -> List[str]:
+    """Union des genres de tous les artistes (batch /artists + fallback /artists/{id}, en parallèle), avec cache."""
     ids = _unique(artist_ids)
     if not ids:
         return []
 
     missing = [a for a in ids if a not in _artist_genres_cache]
-    while missing:
-        chunk = missing[:50]
-        missing = missing[50:]
-        params = {"ids": ",".join(chunk)}
-        data = api_request_with_reauth("GET", "/artists", token_cache, params=params)
-        returned_ids = set()
-        for art in (data.get("artists") or []):
-            aid = art.get("id")
-            if aid:
-                _artist_genres_cache[aid] = art.get("genres") or []
-                returned_ids.add(aid)
-        # fallback individuel si l'API batch ne renvoie pas l'artiste
-        for aid in [x for x in chunk if x not in returned_ids]:
+    if missing:
+        def fetch_batch(chunk: List[str]) -> List[str]:
+            data = api_request_with_reauth("GET", "/artists", token_cache, params={"ids": ",".join(chunk)})
+            resolved: Dict[str, List[str]] = {}
+            for art in (data.get("artists") or []):
+                aid = (art or {}).get("id")
+                if aid:
+                    resolved[aid] = art.get("genres") or []
+            _artist_genres_cache.update(resolved)
+            _remember("artist", resolved)
+            return [x for x in chunk if x not in resolved]
+
+        def fetch_one(aid: str) -> None:
+            # fallback individuel si l'API batch ne renvoie pas l'artiste
             try:
                 a = api_request_with_reauth("GET", f"/artists/{aid}", token_cache)
                 _artist_genres_cache[aid] = a.get("genres") or []
+                _remember("artist", {aid: _artist_genres_cache[aid]})
             except Exception:
-                _artist_genres_cache[aid] = []
+                _artist_genres_cache[aid] = []  # échec : pas journalisé, retenté au prochain --resume
+
+        chunks = [missing[i:i + ARTISTS_BATCH_SIZE] for i in range(0, len(missing), ARTISTS_BATCH_SIZE)]
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            not_returned = [aid for rest in pool.map(fetch_batch, chunks) for aid in rest]
+            list(pool.map(fetch_one, not_returned))
 
     genres = set()
     for aid in ids:
@@ -269,6 +338,111 @@ def get_genres_for_artist_ids(token_cache: Dict[str, Any], artist_ids: List[str]
                 genres.add(g)
     return sorted(genres)
 
+# ===================== Colonne genre (par couples distincts) =====================
+def _column(df: pd.DataFrame, field: str) -> pd.Series:
+    if field in df.columns:
+        return df[field].fillna("").astype(str)
+    return pd.Series("", index=df.index, dtype=object)
+
+
+def _split_ids(df: pd.DataFrame, field: str, sep_in: str = SEP_IN) -> pd.Series:
+    """Table longue des IDs d'une colonne 'id1; id2' (index = index de ligne), sans vides."""
+    ids = _column(df, field).str.replace(",", sep_in).str.split(sep_in).explode().str.strip()
+    return ids[ids.notna() & (ids != "")]
+
+
+def genre_column(
+    df: pd.DataFrame,
+    artist_ids_field: str = ARTIST_IDS_FIELD,
+    album_id_field: str = ALBUM_ID_FIELD,
+    sep_in: str = SEP_IN,
+    sep_out: str = SEP_OUT,
+) -> pd.Series:
+    """
+    Colonne 'genre' de df, calculée par jointures sur des codes entiers plutôt que ligne à ligne :
+    les couples (artist_ids, album_id) distincts sont dépliés en (couple, artiste) — artistes de
+    la ligne + artistes de l'album —, joints une seule fois à la table longue artiste -> genre,
+    dédupliqués puis regroupés par couple ; le résultat revient aux lignes par leurs codes.
+    Les caches (_album_artists_cache, _artist_genres_cache) doivent déjà être remplis.
+    """
+    # Couples distincts : chaque colonne est factorisée seule, puis le couple de codes
+    ids_codes, ids_uniques = pd.factorize(_column(df, artist_ids_field))
+    album_codes, album_uniques = pd.factorize(_column(df, album_id_field).str.strip())
+    codes, combos = pd.factorize(ids_codes.astype(np.int64) * max(len(album_uniques), 1) + album_codes)
+    combos = pd.DataFrame({
+        "combo": np.arange(len(combos)),
+        "ids": combos // max(len(album_uniques), 1),
+        "album": combos % max(len(album_uniques), 1),
+    })
+
+    # (couple, artiste) : artistes de la ligne (dépliés une fois par valeur distincte) + de l'album
+    row_artists = _split_ids(pd.DataFrame({artist_ids_field: ids_uniques}), artist_ids_field, sep_in)
+    album_artists = pd.Series(album_uniques).map(_album_artists_cache).explode().dropna()
+    links = pd.concat([
+        combos.merge(pd.DataFrame({"ids": row_artists.index, "artist": row_artists.to_numpy()}), on="ids"),
+        combos.merge(pd.DataFrame({"album": album_artists.index, "artist": album_artists.to_numpy()}), on="album"),
+    ])[["combo", "artist"]]
+
+    # Table longue artiste -> genre, genres codés dans l'ordre alphabétique
+    artists = links["artist"].unique().tolist()
+    table = pd.Series([_artist_genres_cache.get(a, ()) for a in artists], index=artists, dtype=object).explode()
+    table = table[table.notna() & (table != "")]
+    genre_codes, genre_names = pd.factorize(table.to_numpy(), sort=True)
+    pairs = links.merge(pd.DataFrame({"artist": table.index, "genre": genre_codes}), on="artist")
+
+    # Dédoublonnage (couple, genre) par un tri sur une clé entière ; l'ordre des genres suit
+    n_genres = max(len(genre_names), 1)
+    packed = np.sort(pairs["combo"].to_numpy(np.int64) * n_genres + pairs["genre"].to_numpy(np.int64))
+    packed = packed[np.r_[True, packed[1:] != packed[:-1]]] if len(packed) else packed
+    combo_of, genre_of = packed // n_genres, packed % n_genres
+
+    # Une chaîne par couple : les genres d'un couple sont contigus
+    labels = np.asarray(genre_names, dtype=object)[genre_of].tolist()
+    starts = np.flatnonzero(np.r_[True, combo_of[1:] != combo_of[:-1]]) if len(packed) else packed
+    bounds = np.r_[starts, len(packed)].tolist()
+    values = np.full(len(combos), "", dtype=object)
+    values[combo_of[starts]] = [sep_out.join(labels[i:j]) for i, j in zip(bounds[:-1], bounds[1:])]
+    return pd.Series(values[codes], index=df.index)
+
+
+def enrich_frame(
+    df: pd.DataFrame,
+    token_cache: Dict[str, Any],
+    artist_ids_field: str = ARTIST_IDS_FIELD,
+    album_id_field: str = ALBUM_ID_FIELD,
+    genre_field: str = GENRE_FIELD,
+    sep_in: str = SEP_IN,
+    sep_out: str = SEP_OUT,
+) -> pd.DataFrame:
+    """Résout en lots les albums/artistes encore inconnus de df puis remplit df[genre_field] (en place)."""
+    artist_ids = _split_ids(df, artist_ids_field, sep_in)
+    album_ids = _column(df, album_id_field).str.strip()
+    album_ids = album_ids[album_ids != ""].unique().tolist()
+
+    # Albums distincts résolus en lots parallèles (remplit _album_artists_cache)
+    prefetch_album_artists(token_cache, album_ids)
+    all_artist_ids = artist_ids.unique().tolist()
+    for album_id in album_ids:
+        all_artist_ids.extend(_album_artists_cache.get(album_id, []))
+
+    # Préchargement des genres (remplit _artist_genres_cache ; seuls les IDs nouveaux partent à l'API)
+    get_genres_for_artist_ids(token_cache, _unique(all_artist_ids))
+
+    # Colonne genre calculée par couples distincts (on ajoute/écrase 'genre' en fin de ligne)
+    df[genre_field] = genre_column(df, artist_ids_field, album_id_field, sep_in, sep_out)
+    return df
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """Pic de mémoire résidente du processus (Mo), None si non disponible (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)  # octets sur macOS, Ko sur Linux
+
+
 # ===================== Enrichissement CSV =====================
 def enrich_csv_with_genres(
     input_csv_path: str,
@@ -278,8 +452,16 @@ def enrich_csv_with_genres(
     album_id_field: str = ALBUM_ID_FIELD,
     genre_field: str = GENRE_FIELD,
     sep_in: str = SEP_IN,
-    sep_out: str = SEP_OUT
+    sep_out: str = SEP_OUT,
+    chunksize: Optional[int] = None,
+    resume: bool = False,
 ) -> str:
+    """
+    Ajoute la colonne genre au CSV. Avec `chunksize`, l'entrée est lue par blocs de
+    `chunksize` lignes et chaque bloc est écrit dès qu'il est enrichi (mémoire bornée).
+    Chaque lookup terminé est journalisé dans <output>.journal.jsonl ; avec `resume`,
+    les albums / artistes déjà résolus par un run interrompu ne sont pas redemandés.
+    """
     if not os.path.isabs(input_csv_path):
         input_csv_path = os.path.join(BASE_DIR, input_csv_path)
     if not os.path.isabs(output_csv_path):
@@ -288,46 +470,38 @@ def enrich_csv_with_genres(
     if not os.path.exists(input_csv_path):
         raise FileNotFoundError(f"Fichier introuvable: {input_csv_path}")
 
-    # Lecture du CSV source
-    with open(input_csv_path, "r", encoding="utf-8", newline="") as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
-        in_fields = reader.fieldnames or []
+    # Lecture du CSV source (tout en texte, comme csv.DictReader : aucune conversion de valeurs).
+    # En mode flux, seuls les caches ID -> genres / artistes restent en mémoire entre les blocs.
+    read_opts = dict(dtype=str, keep_default_na=False, encoding="utf-8")
+    chunks = pd.read_csv(input_csv_path, chunksize=chunksize, **read_opts) if chunksize else [pd.read_csv(input_csv_path, **read_opts)]
 
-    # Pré-collecte de tous les artist_ids pour précharger le cache via batch
-    all_artist_ids: List[str] = []
-    for row in rows:
-        raw = (row.get(artist_ids_field) or "")
-        parts = [p.strip() for p in raw.replace(",", sep_in).split(sep_in) if p.strip()]
-        all_artist_ids.extend(parts)
-
-        album_id = (row.get(album_id_field) or "").strip()
-        if album_id:
-            all_artist_ids.extend(get_album_artist_ids(token_cache, album_id))
-
-    # Préchargement (remplit _artist_genres_cache)
-    get_genres_for_artist_ids(token_cache, _unique(all_artist_ids))
+    open_journal(output_csv_path + ".journal.jsonl", resume=resume)
+    if resume:
+        print(f"Reprise: {len(_album_artists_cache)} albums et {len(_artist_genres_cache)} artistes déjà résolus")
 
-    # Champs de sortie (on ajoute/écrase 'genre' en fin de ligne)
-    out_fields = list(in_fields)
-    if genre_field not in out_fields:
-        out_fields.append(genre_field)
-
-    with open(output_csv_path, "w", encoding="utf-8", newline="") as f_out:
-        writer = csv.DictWriter(f_out, fieldnames=out_fields)
-        writer.writeheader()
-
-        for row in rows:
-            raw = (row.get(artist_ids_field) or "")
-            ids = [p.strip() for p in raw.replace(",", sep_in).split(sep_in) if p.strip()]
-
-            album_id = (row.get(album_id_field) or "").strip()
-            if album_id:
-                ids.extend(get_album_artist_ids(token_cache, album_id))
-
-            genres = get_genres_for_artist_ids(token_cache, _unique(ids))
-            row[genre_field] = sep_out.join(genres)
-            writer.writerow(row)
+    n_rows = 0
+    header = True
+    try:
+        with open(output_csv_path, "w", encoding="utf-8", newline="") as f_out:
+            for df in chunks:
+                enrich_frame(df, token_cache, artist_ids_field, album_id_field, genre_field, sep_in, sep_out)
+                df.to_csv(f_out, index=False, header=header, lineterminator="\r\n")
+                header = False
+                n_rows += len(df)
+                if chunksize:
+                    print(f"{n_rows} lignes enrichies (mémoire pic: {_peak_rss_mb()} Mo)")
+            if header:
+                # Entrée sans données : on recopie l'en-tête (+ colonne genre), quoté comme to_csv
+                empty = pd.read_csv(input_csv_path, nrows=0, **read_opts)
+                if genre_field not in empty.columns:
+                    empty[genre_field] = pd.Series(dtype=str)
+                empty.head(0).to_csv(f_out, index=False, lineterminator="\r\n")
+    finally:
+        close_journal()
+
+    print(f"{n_rows} lignes, {len(_artist_genres_cache)} artistes, {len(_album_artists_cache)} albums en cache, "
+          f"mémoire pic: {_peak_rss_mb()} Mo")
+    return output_csv_path
 
 # ===================== Token helper =====================
 def ensure_user_token() -> Dict[str, Any]:
@@ -350,14 +524,27 @@ def ensure_user_token() -> Dict[str, Any]:
     return tok
 
 # ===================== Main =====================
-def main():
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Ajoute la colonne genre (Spotify) à un CSV de titres.")
+    ap.add_argument("--input", default=INPUT_CSV, help=f"CSV source (défaut: {INPUT_CSV})")
+    ap.add_argument("--output", default=OUTPUT_CSV, help=f"CSV de sortie (défaut: {OUTPUT_CSV})")
+    ap.add_argument("--chunksize", type=int, default=None, metavar="N",
+                    help=f"mode flux : lit et écrit par blocs de N lignes (ex. {CHUNK_ROWS}) pour les très gros CSV")
+    ap.add_argument("--resume", action="store_true",
+                    help="recharge le journal <output>.journal.jsonl d'un run interrompu et ne redemande que le reste")
+    return ap.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
     tok = ensure_user_token()
-    out = enrich_csv_with_genres(INPUT_CSV, OUTPUT_CSV, tok)
+    out = enrich_csv_with_genres(args.input, args.output, tok, chunksize=args.chunksize, resume=args.resume)
     print(f"CSV enrichi écrit: {out}")
 
 if __name__ == "__main__":
     try:
         main()
+        spotify_http.print_stats()
     except requests.HTTPError as e:
         try:
             j = e.response.json()
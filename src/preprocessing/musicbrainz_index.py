@@ -0,0 +1,226 @@
+"""
+Offline MusicBrainz artist index.
+
+Builds a compact SQLite file from a MusicBrainz artist JSON dump
+(https://metabrainz.org/datasets -> json-dumps/artist.tar.xz, or the
+extracted `mbdump/artist` file: one JSON artist per line) so that
+enriched_with_gender.py can resolve artists locally instead of calling the
+rate-limited web service.
+
+Two lookup keys:
+    by_name     normalize_artist_name() of the artist name and of its aliases
+    by_spotify  Spotify artist ID taken from the artist's URL relationships
+                (https://open.spotify.com/artist/<id>)
+
+Usage:
+    python musicbrainz_index.py build artist.tar.xz musicbrainz_index.sqlite
+    python musicbrainz_index.py lookup musicbrainz_index.sqlite "Daft Punk"
+"""
+
+import argparse
+import bz2
+import gzip
+import json
+import lzma
+import os
+import re
+import sqlite3
+import sys
+import tarfile
+import time
+
+from enriched_with_gender import artist_record, normalize_artist_name, RECORD_COLUMNS
+
+DEFAULT_INDEX_PATH = "musicbrainz_index.sqlite"
+BATCH_ROWS = 10_000   # rows per executemany while building
+QUERY_CHUNK = 500     # keys per IN (...) lookup
+
+# Name match ranks: a primary name beats an alias when several artists share a key
+RANK_NAME, RANK_ALIAS = 0, 1
+
+_SPOTIFY_ARTIST_URL = re.compile(r"open\.spotify\.com/(?:intl-[a-z-]+/)?artist/([0-9A-Za-z]{22})")
+
+# ============================================================
+# Reading the dump
+# ============================================================
+
+def _open_compressed(path: str):
+    if path.endswith(".xz"):
+        return lzma.open(path, "rb")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    return open(path, "rb")
+
+def iter_dump(path: str):
+    """Yield artist dicts from a JSON-lines dump, plain, compressed or tarred."""
+    if ".tar" in os.path.basename(path):
+        with tarfile.open(path, "r|*") as tar:
+            for member in tar:
+                if member.isfile() and member.name.endswith("mbdump/artist"):
+                    yield from _iter_lines(tar.extractfile(member))
+                    return
+        raise ValueError(f"No mbdump/artist member in {path}")
+    with _open_compressed(path) as f:
+        yield from _iter_lines(f)
+
+def _iter_lines(f):
+    # Binary lines: a streamed tar member cannot be wrapped in a TextIOWrapper
+    for line in f:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+def spotify_ids(artist: dict):
+    """Spotify artist IDs found in the artist's URL relationships."""
+    out = []
+    for rel in artist.get("relations") or []:
+        resource = ((rel or {}).get("url") or {}).get("resource") or ""
+        m = _SPOTIFY_ARTIST_URL.search(resource)
+        if m and m.group(1) not in out:
+            out.append(m.group(1))
+    return out
+
+def artist_row(artist: dict):
+    record = artist_record(artist)
+    return (artist["id"], artist.get("name")) + tuple(record[f] for f in RECORD_FIELDS)
+
+def name_rows(artist: dict):
+    seen = set()
+    names = [(artist.get("name"), RANK_NAME)]
+    names += [((a or {}).get("name"), RANK_ALIAS) for a in artist.get("aliases") or []]
+    for name, rank in names:
+        key = normalize_artist_name(name)
+        if key and key not in seen:
+            seen.add(key)
+            yield (key, artist["id"], rank)
+
+# ============================================================
+# Building
+# ============================================================
+
+# Same fields as the web lookups (enriched_with_gender.artist_record)
+RECORD_FIELDS = tuple(RECORD_COLUMNS)
+
+SCHEMA = f"""
+CREATE TABLE artists (mbid TEXT PRIMARY KEY, name TEXT, {", ".join(f'"{f}" TEXT' for f in RECORD_FIELDS)}) WITHOUT ROWID;
+CREATE TABLE by_name (key TEXT NOT NULL, mbid TEXT NOT NULL, rank INTEGER NOT NULL);
+CREATE TABLE by_spotify (spotify_id TEXT PRIMARY KEY, mbid TEXT NOT NULL) WITHOUT ROWID;
+"""
+
+def build_index(dump_path: str, index_path: str = DEFAULT_INDEX_PATH) -> int:
+    """Build (or rebuild) the index from a dump; returns the number of artists."""
+    tmp_path = index_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    db = sqlite3.connect(tmp_path)
+    # Bulk load: no journal, no fsync, secondary index created at the end
+    db.execute("PRAGMA journal_mode=OFF")
+    db.execute("PRAGMA synchronous=OFF")
+    db.executescript(SCHEMA)
+
+    artists, names, spotify = [], [], []
+    n = 0
+    t0 = time.time()
+
+    def flush():
+        db.executemany(f"INSERT OR REPLACE INTO artists VALUES ({', '.join('?' * (2 + len(RECORD_FIELDS)))})", artists)
+        db.executemany("INSERT INTO by_name VALUES (?, ?, ?)", names)
+        db.executemany("INSERT OR IGNORE INTO by_spotify VALUES (?, ?)", spotify)
+        artists.clear(); names.clear(); spotify.clear()
+
+    for artist in iter_dump(dump_path):
+        if not artist.get("id"):
+            continue
+        artists.append(artist_row(artist))
+        names.extend(name_rows(artist))
+        spotify.extend((sid, artist["id"]) for sid in spotify_ids(artist))
+        n += 1
+        if len(artists) >= BATCH_ROWS:
+            flush()
+            if n % (BATCH_ROWS * 50) == 0:
+                print(f"  {n} artists indexed ({time.time() - t0:.0f}s)")
+    flush()
+
+    db.execute("CREATE INDEX by_name_key ON by_name (key, rank)")
+    db.commit()
+    db.execute("VACUUM")
+    db.close()
+    os.replace(tmp_path, index_path)
+    print(f"Indexed {n} artists in {time.time() - t0:.1f}s -> {index_path}")
+    return n
+
+# ============================================================
+# Lookups
+# ============================================================
+
+_RECORD_SELECT = ", ".join(f'a."{f}"' for f in RECORD_FIELDS)
+
+class MusicBrainzIndex:
+    """Read-only access to an index built by build_index()."""
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"MusicBrainz index not found: {path} (run: musicbrainz_index.py build)")
+        self.path = path
+        self._db = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self._db.execute("PRAGMA mmap_size=1073741824")  # read pages straight from the OS cache
+
+    def _query(self, sql: str, keys):
+        keys = list(dict.fromkeys(k for k in keys if k))
+        for i in range(0, len(keys), QUERY_CHUNK):
+            chunk = keys[i:i + QUERY_CHUNK]
+            yield from self._db.execute(sql.format(marks=",".join("?" * len(chunk))), chunk)
+
+    def by_name(self, keys):
+        """{normalized name: artist record} for keys found in the index."""
+        out = {}
+        # Ordered so the best match (primary name, then first indexed) comes first per key
+        sql = (f"SELECT n.key, {_RECORD_SELECT} FROM by_name n JOIN artists a ON a.mbid = n.mbid"
+               " WHERE n.key IN ({marks}) ORDER BY n.key, n.rank, n.rowid")
+        for key, *values in self._query(sql, keys):
+            out.setdefault(key, dict(zip(RECORD_FIELDS, values)))
+        return out
+
+    def by_spotify(self, ids):
+        """{Spotify artist ID: artist record} for IDs linked from MusicBrainz."""
+        sql = (f"SELECT s.spotify_id, {_RECORD_SELECT} FROM by_spotify s JOIN artists a ON a.mbid = s.mbid"
+               " WHERE s.spotify_id IN ({marks})")
+        return {sid: dict(zip(RECORD_FIELDS, values)) for sid, *values in self._query(sql, ids)}
+
+    def close(self):
+        self._db.close()
+
+# ============================================================
+# CLI
+# ============================================================
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Build or query the offline MusicBrainz artist index.")
+    sub = ap.add_subparsers(dest="command", required=True)
+    b = sub.add_parser("build", help="build the index from an artist JSON dump")
+    b.add_argument("dump", help="artist.tar.xz or an extracted mbdump/artist file")
+    b.add_argument("index", nargs="?", default=DEFAULT_INDEX_PATH)
+    q = sub.add_parser("lookup", help="look up artist names or Spotify IDs")
+    q.add_argument("index")
+    q.add_argument("names", nargs="+")
+    q.add_argument("--spotify", action="store_true", help="the arguments are Spotify artist IDs")
+    args = ap.parse_args(argv)
+
+    if args.command == "build":
+        build_index(args.dump, args.index)
+        return
+    index = MusicBrainzIndex(args.index)
+    if args.spotify:
+        hits = index.by_spotify(args.names)
+        for sid in args.names:
+            print(sid, hits.get(sid))
+    else:
+        hits = index.by_name(normalize_artist_name(n) for n in args.names)
+        for name in args.names:
+            print(name, hits.get(normalize_artist_name(name)))
+    index.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
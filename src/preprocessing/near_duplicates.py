@@ -0,0 +1,314 @@
+"""
+Near-duplicate track detection.
+
+The exports hold the same song under several track IDs and titles
+("Another Day in Paradise - 2016 Remaster", a live take, a single version,
+"feat." variants...). Exact de-duplication (cleaning_steps.dedupe) cannot
+catch these. This module clusters them without comparing every pair of rows:
+
+1. normalize_title() strips remaster / live / edition / version / feat.
+   suffixes, and "(with X)" only when X is one of the track's credited
+   artists ("Dancing (With Myself)" keeps its bracket). Remix, acoustic,
+   instrumental... are different recordings and are never stripped. The
+   main (first) artist is normalized like the MusicBrainz lookups
+   (enriched_with_gender.normalize_artist_name).
+2. Rows sharing (artist, normalized title) are merged directly.
+3. Blocking: only titles sharing the main artist and a title word (their
+   first word, or their rarest one) are compared, so a prolific artist does
+   not make one huge block. Small blocks are compared pairwise; large ones
+   go through MinHash + LSH on character 3-grams. same_song() then keeps a
+   pair only when its numbers / Roman numerals and kept-apart words match,
+   the 3-gram Jaccard similarity is at least `threshold`, and the words are
+   the same up to spacing, filler words and one spelling variant: one extra
+   word ("remix", "part ii") is never enough.
+4. Blocks are processed in parallel (ProcessPoolExecutor), then merged with
+   union-find into cluster IDs. The canonical row of a cluster is the most
+   popular one (earliest release, then first seen, on ties).
+
+Usage:
+    python near_duplicates.py --input data/raw/all_top_songs.csv --output clusters.csv
+    python near_duplicates.py --input big.csv --output canonical.csv --canonical-only --workers 8
+"""
+
+import argparse
+import os
+import re
+import zlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+from enriched_with_gender import normalize_artist_name, parse_artist_field
+
+DEFAULT_THRESHOLD = 0.8   # Jaccard similarity of title 3-grams
+NUM_PERM = 64             # MinHash signature length
+BANDS = 16                # LSH bands (NUM_PERM / BANDS rows per band)
+PAIRWISE_MAX = 32         # blocks up to this many distinct titles are compared pairwise
+TASK_TITLES = 20_000      # distinct titles per worker task
+PARALLEL_MIN_ROWS = 50_000
+
+_MERSENNE = (1 << 31) - 1
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, _MERSENNE, NUM_PERM).astype(np.uint64)
+_PERM_B = _rng.randint(0, _MERSENNE, NUM_PERM).astype(np.uint64)
+
+# ============================================================
+# Title normalization
+# ============================================================
+
+_SUFFIX_WORDS = (r"remaster(?:ed)?|edition|version|mono|stereo|radio edit|"
+                 r"anniversary|deluxe|bonus track|re-?recorded|single|mixed by")
+# Different recordings, kept apart on purpose: a suffix that mentions one of
+# these is never stripped, and two titles that differ in them never match
+KEPT_APART = ("remix", "mix", "instrumental", "acoustic", "karaoke", "demo", "reprise", "acapella")
+_KEEP = rf"(?![^\)\]]*\b(?:{'|'.join(KEPT_APART)})\b)"
+
+# "(... Remastered 2011 ...)", "[Live]"; "live" only as the first word, so
+# "(Can't Live Without Your) Love And Affection" is left alone
+_BRACKETED = re.compile(rf"\s*[\(\[]{_KEEP}(?:live\b|[^\)\]]*\b(?:{_SUFFIX_WORDS})\b)[^\)\]]*[\)\]]", re.I)
+# "(feat. X)" / "[ft. X]": featuring forms at the start of the bracket only
+_BRACKETED_FEAT = re.compile(r"\s*[\(\[]\s*(?:feat\.?|featuring|ft\.)\s+[^\)\]]*[\)\]]", re.I)
+# "(with X)": stripped only when X is one of the track's credited artists,
+# so "Dancing (With Myself)" or "Judy In Disguise (With Glasses)" keep it
+_BRACKETED_WITH = re.compile(r"\s*[\(\[]\s*with\s+([^\)\]]+)[\)\]]", re.I)
+# " - 2016 Remaster", " - Live at Wembley / 1991", " - Single Version"
+_DASH_SUFFIX = re.compile(rf"\s+-\s+(?!.*\b(?:{'|'.join(KEPT_APART)})\b)[^-]*\b(?:{_SUFFIX_WORDS}|live)\b.*$", re.I)
+_FEAT_TAIL = re.compile(r"\s+(?:feat\.?|featuring|ft\.)\s+.+$", re.I)
+_NON_WORD = re.compile(r"[^\w\s]")
+
+def normalize_title(title, credits=()):
+    """
+    Lowercase title without version suffixes or punctuation; None for empty
+    titles. `credits` are the normalized names of the track's artists, used to
+    recognise "(with X)" credits.
+    """
+    key = normalize_artist_name(title)
+    if key is None:
+        return None
+
+    def drop_credit(m):
+        credit = m.group(1)
+        is_credit = any(re.search(rf"(?<!\w){re.escape(c)}(?!\w)", credit) for c in credits if c)
+        return "" if is_credit else m.group(0)
+
+    key = _BRACKETED_WITH.sub(drop_credit, key)
+    key = _BRACKETED_FEAT.sub("", key)
+    key = _BRACKETED.sub("", key)
+    key = _DASH_SUFFIX.sub("", key)
+    key = _FEAT_TAIL.sub("", key)
+    key = " ".join(_NON_WORD.sub(" ", key).split())
+    return key or None
+
+def _credits(raw):
+    return [normalize_artist_name(a) for a in parse_artist_field(raw)]
+
+# ============================================================
+# Similarity inside a block
+# ============================================================
+
+# Small words that vary between spellings of the same title ("rock n roll",
+# "sweet child o mine"); ignored by the word comparison
+FILLER_WORDS = {"the", "a", "an", "and", "n", "o", "of"}
+_ROMAN = re.compile(r"(?:xc|xl|l?x{0,3})(?:ix|iv|v?i{0,3})")
+
+def shingles(text, k=3):
+    padded = f" {text} "
+    return {padded[i:i + k] for i in range(max(1, len(padded) - k + 1))}
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+def title_features(title):
+    """What same_song() compares: 3-grams, words, numbers / Roman numerals, kept-apart words."""
+    words = title.split()
+    content = [w for w in words if w not in FILLER_WORDS] or words
+    return {
+        # 3-grams of the words run together, so spacing and filler words do not count
+        "shingles": shingles("".join(content)),
+        "words": content,
+        "numerals": sorted(re.findall(r"\d+", title) + [w for w in words if _ROMAN.fullmatch(w) and w]),
+        "kept_apart": sorted(w for w in words if w in KEPT_APART),
+    }
+
+def _spelling_variant(a, b):
+    # "colour" / "color", "dancin" / "dancing": long words, same start, most 3-grams shared
+    return min(len(a), len(b)) >= 5 and a[:2] == b[:2] and jaccard(shingles(a), shingles(b)) >= 0.5
+
+def same_song(fa, fb, threshold=DEFAULT_THRESHOLD):
+    """
+    True when two normalized titles (title_features) name the same song:
+    identical numbers / Roman numerals ("part ii" is not "part iii") and
+    kept-apart words ("remix"), 3-gram Jaccard >= threshold on the words run
+    together, and the same words apart from filler words, spacing
+    ("dont" / "don t") and at most one spelling variant. An extra word never
+    passes.
+    """
+    if fa["numerals"] != fb["numerals"] or fa["kept_apart"] != fb["kept_apart"]:
+        return False
+    if jaccard(fa["shingles"], fb["shingles"]) < threshold:
+        return False
+    only_a = [w for w in fa["words"] if w not in fb["words"]]
+    only_b = [w for w in fb["words"] if w not in fa["words"]]
+    if "".join(only_a) == "".join(only_b):
+        return True
+    return len(only_a) == len(only_b) == 1 and _spelling_variant(only_a[0], only_b[0])
+
+def minhash(shingle_set):
+    h = np.fromiter((zlib.crc32(s.encode()) for s in shingle_set), dtype=np.uint64, count=len(shingle_set))
+    return ((_PERM_A[:, None] * h[None, :] + _PERM_B[:, None]) % _MERSENNE).min(axis=1)
+
+def similar_pairs(titles, threshold=DEFAULT_THRESHOLD):
+    """Index pairs (i, j) of `titles` (distinct strings of one block) that are near-duplicates."""
+    features = [title_features(t) for t in titles]
+    n = len(titles)
+    if n <= PAIRWISE_MAX:
+        candidates = ((i, j) for i in range(n) for j in range(i + 1, n))
+    else:
+        rows = NUM_PERM // BANDS
+        signatures = np.stack([minhash(f["shingles"]) for f in features])
+        candidates = set()
+        for band in range(BANDS):
+            buckets = {}
+            for i, sig in enumerate(signatures[:, band * rows:(band + 1) * rows]):
+                buckets.setdefault(sig.tobytes(), []).append(i)
+            for members in buckets.values():
+                candidates.update((a, b) for x, a in enumerate(members) for b in members[x + 1:])
+    return [(i, j) for i, j in candidates if same_song(features[i], features[j], threshold)]
+
+def _block_task(blocks, threshold):
+    """Worker: blocks is a list of (group_ids, titles); returns near-duplicate group ID pairs."""
+    out = []
+    for group_ids, titles in blocks:
+        out.extend((group_ids[i], group_ids[j]) for i, j in similar_pairs(titles, threshold))
+    return out
+
+# ============================================================
+# Clustering
+# ============================================================
+
+def _union_find(n, pairs):
+    parent = np.arange(n)
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b in pairs:
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)
+    return np.array([find(x) for x in range(n)])
+
+def _tasks(blocks):
+    task, size = [], 0
+    for block in blocks:
+        task.append(block)
+        size += len(block[1])
+        if size >= TASK_TITLES:
+            yield task
+            task, size = [], 0
+    if task:
+        yield task
+
+def find_near_duplicates(df, title_col="track_name", artist_col="artist_names",
+                         threshold=DEFAULT_THRESHOLD, workers=None):
+    """
+    Returns a copy of `df` with `cluster_id` (0..k-1, in order of first
+    appearance) and `is_canonical` (one True row per cluster).
+    """
+    # Step 1: one normalization per distinct (title, artists) pair
+    pair_codes, pairs = pd.MultiIndex.from_arrays(
+        [df[title_col].fillna("").astype(str), df[artist_col].fillna("").astype(str)]).factorize()
+    normalized = []
+    for title, raw_artists in pairs:
+        credits = _credits(raw_artists)
+        normalized.append((credits[0] if credits else None, normalize_title(title, credits)))
+    normalized = np.array(normalized + [(None, None)], dtype=object)[pair_codes]
+    artist_keys = pd.Series(normalized[:, 0], index=df.index)
+    title_keys = pd.Series(normalized[:, 1], index=df.index)
+
+    # Step 2: identical (artist, title) keys form one group; rows without a key stay alone
+    keyed = title_keys.notna() & artist_keys.notna()
+    group = np.empty(len(df), dtype=np.int64)
+    codes, _ = pd.MultiIndex.from_arrays([artist_keys[keyed], title_keys[keyed]]).factorize()
+    group[keyed.to_numpy()] = codes
+    n_keyed = codes.max() + 1 if len(codes) else 0
+    group[~keyed.to_numpy()] = n_keyed + np.arange((~keyed).sum())
+
+    # Step 3: blocks of distinct titles per (main artist, title key). Each title
+    # goes into two blocks, keyed by its first word and by its rarest word, so
+    # a prolific artist ("Various Artists", composers) never forms one huge block
+    distinct = pd.DataFrame({"artist": artist_keys[keyed].to_numpy(), "title": title_keys[keyed].to_numpy(),
+                             "group": codes}).drop_duplicates("group")
+    words = [title_features(t)["words"] for t in distinct["title"]]
+    frequency = Counter(w for ws in words for w in set(ws))
+    title_blocks = {
+        "first": [ws[0] for ws in words],
+        "rarest": [min(ws, key=lambda w: (frequency[w], w)) for ws in words],
+    }
+    blocks, seen = [], set()
+    for key in title_blocks.values():
+        for _, g in distinct.assign(key=key).groupby(["artist", "key"], sort=False):
+            ids = tuple(g["group"])
+            if len(ids) > 1 and ids not in seen:
+                seen.add(ids)
+                blocks.append((list(ids), g["title"].tolist()))
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(df) >= PARALLEL_MIN_ROWS:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(_block_task, _tasks(blocks), repeat(threshold))
+            pairs = {p for chunk in results for p in chunk}
+    else:
+        pairs = set(_block_task(blocks, threshold))
+
+    # Step 4: clusters and canonical rows
+    roots = _union_find(group.max() + 1 if len(group) else 0, pairs)[group]
+    out = df.copy()
+    out["cluster_id"] = pd.factorize(roots)[0]
+    popularity = df["track_popularity"] if "track_popularity" in df else pd.Series(0, index=df.index)
+    released = df["album_release_date"] if "album_release_date" in df else pd.Series("", index=df.index)
+    order = pd.DataFrame({
+        "cluster": out["cluster_id"].to_numpy(),
+        "popularity": pd.to_numeric(popularity, errors="coerce").to_numpy(),
+        "released": released.astype(str).to_numpy(),
+        "row": np.arange(len(df)),
+    }).sort_values(["cluster", "popularity", "released", "row"], ascending=[True, False, True, True],
+                   na_position="last")
+    canonical = np.zeros(len(df), dtype=bool)
+    canonical[order.drop_duplicates("cluster")["row"].to_numpy()] = True
+    out["is_canonical"] = canonical
+    return out
+
+def canonical_rows(clustered):
+    """One row per cluster (the canonical one), without the helper columns."""
+    return clustered[clustered["is_canonical"]].drop(columns=["cluster_id", "is_canonical"])
+
+# ============================================================
+# CLI
+# ============================================================
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Cluster near-duplicate tracks (same song, different ID / title variant).")
+    ap.add_argument("--input", default="data/raw/all_top_songs.csv")
+    ap.add_argument("--output", required=True)
+    ap.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                    help="minimum Jaccard similarity of the 3-grams of two normalized titles")
+    ap.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    ap.add_argument("--canonical-only", action="store_true", help="write one row per cluster")
+    args = ap.parse_args(argv)
+
+    df = pd.read_csv(args.input)
+    clustered = find_near_duplicates(df, threshold=args.threshold, workers=args.workers)
+    n_clusters = clustered["cluster_id"].nunique()
+    print(f"{len(df)} rows -> {n_clusters} clusters ({len(df) - n_clusters} near-duplicates)")
+    (canonical_rows(clustered) if args.canonical_only else clustered).to_csv(args.output, index=False)
+    print("Saved:", args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Validation stage: schema and plausibility checks on a tracks CSV.
+
+Every rule is a vectorized test over whole columns that returns the mask of
+violating rows; nothing loops over rows in Python. Rules have a severity:
+
+    error     the value is wrong (popularity outside 0-100, malformed IDs...)
+    warning   the value is a placeholder: fill_missing in cleaning_steps.py
+              writes 0 for a missing release_year / track_popularity, and
+              those zeros end up in the decade charts
+
+The report is JSON: per rule, its severity, the number of violating rows and
+a few examples. With a chunksize the CSV is streamed, so a multi-million-row
+file is checked in one pass with bounded memory. `fail_fast` raises
+ValidationError on the first chunk that has an error, for use in pipelines.
+
+Usage:
+    python src/preprocessing/validation.py
+    python src/preprocessing/validation.py --input big.csv --chunksize 500000 --report report.json
+    python src/preprocessing/validation.py --fail-fast        # exit code 1 on the first error
+
+or from Python:
+    from validation import validate_frame, validate_csv
+"""
+
+import argparse
+import datetime
+import json
+import sys
+
+import pandas as pd
+
+INPUT_CSV = "data/processed/cleaned_final_dataset.csv"
+
+POPULARITY_RANGE = (0, 100)
+YEAR_RANGE = (1900, datetime.date.today().year + 1)
+DURATION_MS_RANGE = (10_000, 3_600_000)   # 10 s to 1 h
+MAX_EXAMPLES = 5
+
+# Spotify IDs are 22 base62 characters; multi-artist fields are ';'-separated
+SPOTIFY_ID = r"[0-9A-Za-z]{22}"
+SPOTIFY_ID_LIST = rf"{SPOTIFY_ID}(?:\s*;\s*{SPOTIFY_ID})*"
+
+# Left to read_csv's type inference: a clean column is parsed as numbers in C,
+# and a malformed value only turns that column into text for the rules to report
+NUMERIC_COLUMNS = ['track_popularity', 'release_year', 'duration_ms', 'album_total_tracks']
+
+class ValidationError(ValueError):
+    """Raised in fail-fast mode; `report` holds the violations found so far."""
+
+    def __init__(self, message, report):
+        super().__init__(message)
+        self.report = report
+
+# ============================================================
+# Rules: each takes the frame and returns (mask of violating rows, column shown in examples)
+# ============================================================
+
+def _number(df, col):
+    return pd.to_numeric(df[col], errors='coerce')
+
+def _outside(values, bounds):
+    low, high = bounds
+    return values.notna() & ~values.between(low, high)
+
+def popularity_range(df):
+    pop = _number(df, 'track_popularity')
+    return _outside(pop, POPULARITY_RANGE) | (pop.isna() & df['track_popularity'].notna()), 'track_popularity'
+
+def popularity_missing(df):
+    pop = _number(df, 'track_popularity')
+    return df['track_popularity'].isna() | pop.eq(0), 'track_popularity'
+
+def release_year_range(df):
+    year = _number(df, 'release_year')
+    return _outside(year.where(year != 0), YEAR_RANGE) | (year.isna() & df['release_year'].notna()), 'release_year'
+
+def release_year_missing(df):
+    return df['release_year'].isna() | _number(df, 'release_year').eq(0), 'release_year'
+
+def release_year_matches_date(df):
+    year = _number(df, 'release_year')
+    date_year = pd.to_numeric(df['album_release_date'].astype('str').str[:4], errors='coerce')
+    return year.gt(0) & date_year.notna() & year.ne(date_year), 'album_release_date'
+
+def duration_range(df):
+    duration = _number(df, 'duration_ms')
+    return _outside(duration, DURATION_MS_RANGE) | duration.isna(), 'duration_ms'
+
+def _bad_format(df, col, pattern):
+    return ~df[col].astype('str').str.fullmatch(pattern).fillna(False).astype(bool) | df[col].isna(), col
+
+def track_id_format(df):
+    return _bad_format(df, 'track_id', SPOTIFY_ID)
+
+def album_id_format(df):
+    return _bad_format(df, 'album_id', SPOTIFY_ID)
+
+def artist_ids_format(df):
+    return _bad_format(df, 'artist_ids', SPOTIFY_ID_LIST)
+
+def artist_count_mismatch(df):
+    names = df['artist_names'].astype('str').str.count(';')
+    ids = df['artist_ids'].astype('str').str.count(';')
+    return df['artist_names'].notna() & df['artist_ids'].notna() & names.ne(ids), 'artist_ids'
+
+# (name, severity, function, columns it needs)
+RULES = [
+    ("popularity_range", "error", popularity_range, ['track_popularity']),
+    ("popularity_missing", "warning", popularity_missing, ['track_popularity']),
+    ("release_year_range", "error", release_year_range, ['release_year']),
+    ("release_year_missing", "warning", release_year_missing, ['release_year']),
+    ("release_year_matches_date", "warning", release_year_matches_date, ['release_year', 'album_release_date']),
+    ("duration_range", "error", duration_range, ['duration_ms']),
+    ("track_id_format", "error", track_id_format, ['track_id']),
+    ("album_id_format", "error", album_id_format, ['album_id']),
+    ("artist_ids_format", "error", artist_ids_format, ['artist_ids']),
+    ("artist_count_mismatch", "error", artist_count_mismatch, ['artist_names', 'artist_ids']),
+]
+
+# ============================================================
+# Running the rules
+# ============================================================
+
+def _empty_report(source):
+    return {"source": source, "rows": 0, "ok": True, "skipped_rules": [], "violations": {}}
+
+def validate_frame(df, rules=RULES, report=None, offset=0):
+    """
+    Apply `rules` to `df` and add the results to `report` (a new one when
+    None). `offset` is the position of df's first row in the whole input,
+    used for the row numbers in the examples. Returns the report.
+    """
+    if report is None:
+        report = _empty_report(None)
+    for name, severity, rule, columns in rules:
+        if not set(columns) <= set(df.columns):
+            if name not in report["skipped_rules"]:
+                report["skipped_rules"].append(name)
+            continue
+        mask, shown = rule(df)
+        mask = mask.to_numpy(dtype=bool)
+        count = int(mask.sum())
+        if not count:
+            continue
+        entry = report["violations"].setdefault(name, {"severity": severity, "count": 0, "examples": []})
+        entry["count"] += count
+        room = MAX_EXAMPLES - len(entry["examples"])
+        if room > 0:
+            rows = mask.nonzero()[0][:room]
+            values = df[shown].iloc[rows]
+            ids = df['track_id'].iloc[rows] if 'track_id' in df.columns else [None] * len(rows)
+            entry["examples"] += [
+                {"row": int(offset + r), "track_id": None if pd.isna(t) else str(t),
+                 shown: None if pd.isna(v) else str(v)}
+                for r, t, v in zip(rows, ids, values)
+            ]
+        if severity == "error":
+            report["ok"] = False
+    report["rows"] += len(df)
+    return report
+
+def read_for_validation(path, chunksize=None):
+    """The CSV with every non-numeric column read as text (IDs must not be parsed as numbers)."""
+    columns = pd.read_csv(path, nrows=0).columns
+    dtype = {col: 'str' for col in columns if col not in NUMERIC_COLUMNS}
+    return pd.read_csv(path, dtype=dtype, chunksize=chunksize)
+
+def validate_csv(input_csv_path=INPUT_CSV, chunksize=None, fail_fast=False, rules=RULES):
+    """Validate a CSV in one pass (streamed when chunksize is set); returns the report."""
+    report = _empty_report(str(input_csv_path))
+    chunks = read_for_validation(input_csv_path, chunksize)
+    if chunksize is None:
+        chunks = [chunks]
+    for chunk in chunks:
+        validate_frame(chunk, rules, report, offset=report["rows"])
+        if fail_fast and not report["ok"]:
+            failed = [n for n, v in report["violations"].items() if v["severity"] == "error"]
+            raise ValidationError(f"{input_csv_path}: validation failed ({', '.join(failed)}) "
+                                  f"within the first {report['rows']} rows", report)
+    return report
+
+def print_summary(report):
+    print(f"Validated {report['rows']} rows from {report['source']}: {'OK' if report['ok'] else 'FAILED'}")
+    for name, entry in report["violations"].items():
+        print(f"  {entry['severity']:<8} {name:<28} {entry['count']:>8} rows")
+    if report["skipped_rules"]:
+        print(f"  skipped (missing columns): {', '.join(report['skipped_rules'])}")
+
+# ============================================================
+# CLI
+# ============================================================
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Validate a tracks CSV (ranges, sentinels, ID formats).")
+    ap.add_argument("--input", default=INPUT_CSV)
+    ap.add_argument("--report", default=None, help="write the JSON report to this file (default: stdout)")
+    ap.add_argument("--chunksize", type=int, default=None, metavar="N",
+                    help="stream the input N rows at a time (for files larger than RAM)")
+    ap.add_argument("--fail-fast", action="store_true", help="stop at the first chunk with an error")
+    args = ap.parse_args(argv)
+
+    try:
+        report = validate_csv(args.input, args.chunksize, args.fail_fast)
+    except ValidationError as e:
+        print(e, file=sys.stderr)
+        report = e.report
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print_summary(report)
+    else:
+        print(text)
+    return 0 if report["ok"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+from typing import Dict, Any, Optional
+
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# ---- Réglages du pool HTTP (surchargeables par variables d'env) ----
+POOL_SIZE: int = int(os.getenv("SPOTIFY_POOL_SIZE", "10"))          # connexions gardées ouvertes par hôte
+KEEP_ALIVE: bool = os.getenv("SPOTIFY_KEEP_ALIVE", "1") not in ("0", "false", "False", "")
+
+# ---- Limiteur de débit partagé ----
+RATE: float = float(os.getenv("SPOTIFY_RATE", "20"))               # requêtes/s de départ
+MAX_RATE: float = float(os.getenv("SPOTIFY_MAX_RATE", "200"))      # plafond sondé tant qu'aucun 429 n'arrive
+INCREASE: float = 0.02                                             # +2 % de débit par réponse réussie
+MAX_RETRIES: int = int(os.getenv("SPOTIFY_MAX_RETRIES", "5"))
+BACKOFF_BASE: float = 0.5                                          # s, doublé à chaque tentative
+BACKOFF_CAP: float = 30.0
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# ---- Compteurs de la session (par exécution) ----
+_stats_lock = threading.Lock()
+_stats: Dict[str, int] = {"requests": 0, "opened": 0}
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+# ------------------------ Pools urllib3 instrumentés ------------------------
+def _count(key: str) -> None:
+    with _stats_lock:
+        _stats[key] += 1
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    def _new_conn(self):
+        _count("opened")
+        return super()._new_conn()
+
+    def urlopen(self, *args, **kwargs):
+        _count("requests")
+        return super().urlopen(*args, **kwargs)
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def _new_conn(self):
+        _count("opened")
+        return super()._new_conn()
+
+    def urlopen(self, *args, **kwargs):
+        _count("requests")
+        return super().urlopen(*args, **kwargs)
+
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter dont les pools comptent les connexions ouvertes vs réutilisées."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+
+# ------------------------ Limiteur de débit (token bucket adaptatif) ------------------------
+class RateLimiter:
+    """
+    Token bucket partagé par tous les threads du processus.
+
+    - acquire() bloque tant qu'une fenêtre Retry-After est ouverte, puis consomme un jeton ;
+    - on_success() augmente le débit de INCREASE (proportionnel) jusqu'à max_rate : le débit
+      dépasse donc la valeur de départ tant que le serveur suit ;
+    - on_throttle() (429, et seulement 429) divise le débit par 2 et met TOUS les workers en pause.
+
+    Sans `burst` explicite, le seau contient au plus une seconde de jetons au débit courant.
+    """
+
+    def __init__(self, rate: float = RATE, max_rate: float = MAX_RATE, burst: Optional[float] = None,
+                 min_rate: float = 0.5) -> None:
+        self.min_rate = min_rate
+        self.rate = max(float(rate), min_rate)
+        self.max_rate = max(float(max_rate), self.rate)
+        self._burst = burst
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+        self.stats: Dict[str, float] = {"acquired": 0, "throttled": 0, "retries": 0, "waited_s": 0.0, "paused_s": 0.0}
+
+    @property
+    def burst(self) -> float:
+        return self._burst if self._burst is not None else max(1.0, self.rate)
+
+    def acquire(self) -> None:
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                else:
+                    self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        self.stats["acquired"] += 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+                self.stats["waited_s"] += wait
+            time.sleep(wait)
+
+    def on_throttle(self, retry_after: float) -> None:
+        with self.lock:
+            self.stats["throttled"] += 1
+            now = time.monotonic()
+            if now >= self.paused_until:
+                # Une seule baisse de débit par fenêtre, même si plusieurs workers reçoivent le 429
+                self.rate = max(self.min_rate, self.rate / 2)
+            until = now + max(retry_after, 0.0)
+            if until > self.paused_until:
+                self.stats["paused_s"] += until - max(self.paused_until, now)
+                self.paused_until = until
+            # Le seau repart vide à la fin de la fenêtre : pas de rafale de tous les workers à la reprise
+            self.tokens = 0
+            self.updated = max(self.updated, self.paused_until)
+
+    def on_success(self) -> None:
+        with self.lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate * (1 + INCREASE))
+
+    def on_retry(self) -> None:
+        with self.lock:
+            self.stats["retries"] += 1
+
+
+limiter = RateLimiter()
+
+
+def _backoff(attempt: int) -> float:
+    # Backoff exponentiel avec jitter ("equal jitter") : évite que les workers repartent ensemble
+    d = min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt))
+    return d / 2 + random.uniform(0, d / 2)
+
+
+def _retry_after(r: requests.Response) -> float:
+    try:
+        return float(r.headers.get("Retry-After", "1"))
+    except ValueError:
+        return 1.0
+
+
+# ------------------------ Session partagée ------------------------
+def build_session(pool_size: int = POOL_SIZE, keep_alive: bool = KEEP_ALIVE) -> requests.Session:
+    s = requests.Session()
+    adapter = PooledAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    s.headers["Connection"] = "keep-alive" if keep_alive else "close"
+    return s
+
+
+def get_session() -> requests.Session:
+    """Session unique du processus (créée au premier appel, partagée entre threads)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = build_session(POOL_SIZE, KEEP_ALIVE)
+    return _session
+
+
+def configure(pool_size: Optional[int] = None, keep_alive: Optional[bool] = None) -> None:
+    """Change la taille du pool / le keep-alive ; la session est recréée au prochain appel."""
+    global POOL_SIZE, KEEP_ALIVE, _session
+    with _session_lock:
+        if pool_size is not None:
+            POOL_SIZE = max(1, int(pool_size))
+        if keep_alive is not None:
+            KEEP_ALIVE = bool(keep_alive)
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def request(method: str, url: str, max_retries: int = MAX_RETRIES, **kwargs: Any) -> requests.Response:
+    """
+    Envoie la requête via la session poolée, en passant par le limiteur partagé.
+    429/5xx et erreurs réseau sont retentés (Retry-After respecté, backoff avec jitter) ;
+    la dernière réponse est renvoyée telle quelle si les essais sont épuisés.
+    """
+    attempt = 0
+    while True:
+        limiter.acquire()
+        try:
+            r = get_session().request(method.upper(), url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt >= max_retries:
+                raise
+            limiter.on_retry()
+            time.sleep(_backoff(attempt))
+            attempt += 1
+            continue
+
+        if r.status_code not in RETRY_STATUSES or attempt >= max_retries:
+            if r.status_code < 400:
+                limiter.on_success()
+            return r
+
+        limiter.on_retry()
+        if r.status_code == 429:
+            # Pause globale : tous les workers attendent la fin de la fenêtre Retry-After
+            limiter.on_throttle(max(_retry_after(r), _backoff(attempt)))
+        else:
+            time.sleep(_backoff(attempt))
+        attempt += 1
+
+
+# ------------------------ Statistiques ------------------------
+def connection_stats() -> Dict[str, int]:
+    with _stats_lock:
+        total = _stats["requests"]
+        opened = _stats["opened"]
+    return {"requests": total, "opened": opened, "reused": max(total - opened, 0)}
+
+
+def reset_stats() -> None:
+    with _stats_lock:
+        for k in _stats:
+            _stats[k] = 0
+    with limiter.lock:
+        for k in limiter.stats:
+            limiter.stats[k] = 0
+
+
+def throttle_stats() -> Dict[str, float]:
+    with limiter.lock:
+        st = dict(limiter.stats)
+        st["rate"] = limiter.rate
+    return st
+
+
+def print_stats() -> None:
+    st = connection_stats()
+    print(f"Connexions HTTP: {st['requests']} requêtes, {st['opened']} ouvertes, {st['reused']} réutilisées")
+    th = throttle_stats()
+    print(
+        f"Limiteur: {int(th['throttled'])} réponses 429, {int(th['retries'])} nouvelles tentatives, "
+        f"{th['paused_s']:.1f}s de pause Retry-After, {th['waited_s']:.1f}s d'attente cumulée (tous threads), débit final {th['rate']:.1f} req/s"
+    )